@@ -0,0 +1,2 @@
+# Copyright (c) 2024 Sebastian Raaphorst.
+# For license information see LICENSE or https://opensource.org/licenses/BSD-3-Clause
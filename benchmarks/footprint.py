@@ -0,0 +1,84 @@
+# Copyright (c) 2024 Sebastian Raaphorst.
+# For license information see LICENSE or https://opensource.org/licenses/BSD-3-Clause
+
+"""
+Benchmark of the per-object memory of resident players and records, and of attribute access and the
+match loop on them, e.g. to compare slotted and unslotted classes.
+
+Run from the repository root with:
+    python -m benchmarks.footprint
+"""
+
+from argparse import ArgumentParser
+from timeit import repeat
+from typing import Callable, Optional
+import tracemalloc
+
+from rps.match import Match
+from rps.players import *
+from rps.players.ensemble_player import EnsembleRecord, StrategyConfidence
+from rps.rps import RPS
+
+
+def bytes_per_object(factory: Callable[[], object], count: int) -> float:
+    """
+    Return the memory allocated per object when count objects are kept resident.
+    """
+    tracemalloc.start()
+    objects = [factory() for _ in range(count)]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return size / count
+
+
+def best_time(stmt: Callable[[], object] | str, number: int, namespace: Optional[dict] = None) -> float:
+    """
+    Return the best time per call of stmt in nanoseconds.
+    """
+    return min(repeat(stmt, number=number, repeat=5, globals=namespace)) / number * 1e9
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--count', type=int, default=10000, help='number of resident objects per type')
+    parser.add_argument('--rounds', type=int, default=20000, help='number of rounds per match')
+    args = parser.parse_args()
+
+    # The rng state of each player is the same size either way, and dominates its memory, so a single rng
+    # is shared by all the players to measure the objects themselves.
+    rng = RandomPlayer(name='Shared').rng
+    factories: list[tuple[str, Callable[[], object]]] = [
+        ('RandomPlayer', lambda: RandomPlayer(name='Random', rng=rng)),
+        ('ConstantPlayer', lambda: ConstantPlayer(name='Rock', symbol=RPS.ROCK, rng=rng)),
+        ('PatternPlayer', lambda: PatternPlayer(name='RPS', pattern=[RPS.ROCK, RPS.PAPER, RPS.SCISSORS], rng=rng)),
+        ('BeatPreviousMovePlayer', lambda: BeatPreviousMovePlayer(name='BPM', rng=rng)),
+        ('MarkovChainPlayer', lambda: MarkovChainPlayer(name='MC', chain_length=2, rng=rng)),
+        ('DoubleMarkovChainPlayer', lambda: DoubleMarkovChainPlayer(name='DMC', chain_length=2, rng=rng)),
+        ('EnsembleRecord', lambda: EnsembleRecord(BeatPreviousMovePlayer(name='BPM', rng=rng))),
+        ('StrategyConfidence', lambda: StrategyConfidence(0.5, {sym: 0.5 for sym in RPS})),
+    ]
+    print(f'Memory per resident object, excluding rng state (bytes, {args.count} objects):')
+    for name, factory in factories:
+        print(f'\t{name:24} {bytes_per_object(factory, args.count):8.0f}')
+
+    print('Attribute access (ns):')
+    namespace = {'player': MarkovChainPlayer(name='MC', chain_length=2),
+                 'record': EnsembleRecord(BeatPreviousMovePlayer(name='BPM'))}
+    for stmt in ('player.rng', 'player._context', 'record.str_prob', 'record.sym_cond_prob'):
+        print(f'\t{stmt:24} {best_time(stmt, 1000000, namespace):8.1f}')
+
+    print(f'Per round of Match.play (ns, {args.rounds} rounds):')
+    pairings = [
+        (MarkovChainPlayer(name='3-MarkovChain', chain_length=3), BeatPreviousMovePlayer(name='BPM')),
+        (DoubleMarkovChainPlayer(name='2-DoubleMarkov', chain_length=2), RandomPlayer(name='Random')),
+        (EnsemblePlayer(name='Ensemble', strategies=[DoubleMarkovChainPlayer(name=f'E-DM-{k}', chain_length=k)
+                                                     for k in range(1, 5)]), RandomPlayer(name='Random')),
+    ]
+    for p1, p2 in pairings:
+        match = Match(p1, p2, args.rounds, rng=0)
+        print(f'\t{p1.name + " vs " + p2.name:30} {best_time(match.play, 1) / args.rounds:8.1f}')
+
+
+if __name__ == '__main__':
+    main()
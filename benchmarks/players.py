@@ -0,0 +1,164 @@
+# Copyright (c) 2024 Sebastian Raaphorst.
+# For license information see LICENSE or https://opensource.org/licenses/BSD-3-Clause
+
+"""
+Benchmark of the match loop for each type of player against fixed opponents, reporting the rounds
+per second and the peak memory of each case, optionally as JSON, and optionally checking for
+regressions against a previous JSON report.
+
+Run from the repository root with, e.g.:
+    python -m benchmarks.players --output before.json
+    python -m benchmarks.players --baseline before.json --tolerance 0.1
+"""
+
+from argparse import ArgumentParser
+from dataclasses import asdict, dataclass
+from time import perf_counter
+from typing import final, Callable, Optional
+import json
+import platform
+import re
+import sys
+import tracemalloc
+
+from rps.match import Match
+from rps.players import *
+from rps.rps import RPS
+
+
+@final
+@dataclass(frozen=True)
+class BenchmarkCase:
+    name: str
+    player: Callable[[], AbstractPlayer]
+    opponent: Callable[[], AbstractPlayer]
+
+
+@final
+@dataclass(frozen=True)
+class BenchmarkResult:
+    name: str
+    rounds: int
+    seconds: float
+    rounds_per_second: float
+    peak_memory_bytes: int
+
+
+def ensemble(size: int) -> EnsemblePlayer:
+    """
+    An ensemble of size strategies, cycling through double Markov chains of increasing length and the
+    previous move players, like the one in main.py.
+    """
+    factories = [
+        lambda i: DoubleMarkovChainPlayer(name=f'E-DM-{i}', chain_length=i // 3 + 1),
+        lambda i: BeatPreviousMovePlayer(name=f'E-BPM-{i}'),
+        lambda i: BeatenByPreviousMovePlayer(name=f'E-BBPM-{i}'),
+    ]
+    return EnsemblePlayer(name=f'Ensemble-{size}',
+                          strategies=[factories[i % len(factories)](i) for i in range(size)],
+                          deterministic=True)
+
+
+def benchmark_cases() -> list[BenchmarkCase]:
+    opponents: list[tuple[str, Callable[[], AbstractPlayer]]] = [
+        ('Random', lambda: RandomPlayer(name='Opponent')),
+        ('BeatPreviousMove', lambda: BeatPreviousMovePlayer(name='Opponent')),
+    ]
+    players: list[tuple[str, Callable[[], AbstractPlayer]]] = [
+        ('Random', lambda: RandomPlayer(name='Player')),
+        ('Pattern', lambda: PatternPlayer(name='Player', pattern=[RPS.ROCK, RPS.PAPER, RPS.SCISSORS])),
+        *((f'MarkovChain-{k}', lambda k=k: MarkovChainPlayer(name='Player', chain_length=k)) for k in range(1, 7)),
+        *((f'DoubleMarkovChain-{k}', lambda k=k: DoubleMarkovChainPlayer(name='Player', chain_length=k))
+          for k in range(1, 4)),
+        *((f'Ensemble-{n}', lambda n=n: ensemble(n)) for n in (2, 6, 12)),
+    ]
+    return [BenchmarkCase(f'{player_name} vs {opponent_name}', player, opponent)
+            for player_name, player in players
+            for opponent_name, opponent in opponents]
+
+
+def run_case(case: BenchmarkCase, rounds: int, repeat: int, seed: int, vectorized: bool) -> BenchmarkResult:
+    """
+    Time the best of repeat seeded matches after a warm-up match, and then measure the peak memory of
+    one more match separately, since tracing the memory slows the match down.
+    """
+    match = Match(case.player(), case.opponent(), rounds, rng=seed, vectorized=vectorized)
+    match.play()
+    seconds = float('inf')
+    for _ in range(repeat):
+        start = perf_counter()
+        match.play()
+        seconds = min(seconds, perf_counter() - start)
+
+    tracemalloc.start()
+    match.play()
+    peak_memory_bytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return BenchmarkResult(name=case.name,
+                           rounds=rounds,
+                           seconds=seconds,
+                           rounds_per_second=rounds / seconds,
+                           peak_memory_bytes=peak_memory_bytes)
+
+
+def find_regressions(results: list[BenchmarkResult], baseline: dict, tolerance: float) -> list[str]:
+    """
+    Compare the results to a previous report, and describe the cases that are more than tolerance
+    slower in rounds per second.
+    """
+    baseline_rates = {result['name']: result['rounds_per_second'] for result in baseline['results']}
+    regressions = []
+    for result in results:
+        baseline_rate = baseline_rates.get(result.name)
+        if baseline_rate is not None and result.rounds_per_second < baseline_rate * (1 - tolerance):
+            regressions.append(f'{result.name}: {baseline_rate:,.0f} -> {result.rounds_per_second:,.0f} rounds/s')
+    return regressions
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = ArgumentParser(description='Benchmark the match loop for each type of player.')
+    parser.add_argument('--rounds', type=int, default=20000, help='rounds per match')
+    parser.add_argument('--repeat', type=int, default=3, help='matches to time per case, keeping the best')
+    parser.add_argument('--seed', type=int, default=0, help='seed for the matches')
+    parser.add_argument('--filter', default='', help='regular expression selecting the cases to run')
+    parser.add_argument('--scalar', action='store_true', help='play every match round by round')
+    parser.add_argument('--output', help='file to write the JSON report to')
+    parser.add_argument('--baseline', help='JSON report to check for regressions against')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='fraction of the baseline rounds per second that counts as a regression')
+    args = parser.parse_args(argv)
+
+    cases = [case for case in benchmark_cases() if re.search(args.filter, case.name)]
+    nsp = max((len(case.name) for case in cases), default=0)
+    results = []
+    for case in cases:
+        result = run_case(case, args.rounds, args.repeat, args.seed, not args.scalar)
+        results.append(result)
+        print(f'{result.name:{nsp}} {result.rounds_per_second:>12,.0f} rounds/s '
+              f'{result.peak_memory_bytes / 1024:>10,.1f} KiB peak')
+
+    if args.output is not None:
+        report = {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'rounds': args.rounds,
+            'seed': args.seed,
+            'vectorized': not args.scalar,
+            'results': [asdict(result) for result in results],
+        }
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline) as file:
+            regressions = find_regressions(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}', file=sys.stderr)
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
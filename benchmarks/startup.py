@@ -0,0 +1,85 @@
+# Copyright (c) 2024 Sebastian Raaphorst.
+# For license information see LICENSE or https://opensource.org/licenses/BSD-3-Clause
+
+"""
+Benchmark of the startup time of short-lived invocations, each in a fresh interpreter: importing the
+packages, and playing a single short match. The time of an empty interpreter is reported separately,
+and subtracted from the others.
+
+Each invocation is also timed with every name registered by the lazily imported packages forced on
+import, as if the packages imported all of their submodules eagerly, so that the saving of the lazy
+imports is reported alongside.
+
+Run from the repository root with:
+    python -m benchmarks.startup
+"""
+
+from argparse import ArgumentParser
+from statistics import median
+from time import perf_counter
+import os
+import subprocess
+import sys
+
+INVOCATIONS: list[tuple[str, str]] = [
+    ('empty interpreter', 'pass'),
+    ('import rps', 'import rps'),
+    ('import rps.match', 'import rps.match'),
+    ('single match',
+     'from rps.match import Match\n'
+     'from rps.players import MarkovChainPlayer, RandomPlayer\n'
+     'Match(MarkovChainPlayer(name="Markov"), RandomPlayer(name="Random"), 100, rng=0).play()'),
+    ('star imports',
+     'from rps.match import *\n'
+     'from rps.players import *'),
+]
+
+# The packages whose names are imported lazily, in the order in which they are forced for the eager times.
+LAZY_PACKAGES: tuple[str, ...] = ('rps', 'rps.players', 'rps.match', 'rps.analysis')
+
+# Forces the import of every name of the lazy packages, before the code of an invocation.
+EAGER_IMPORTS: str = (
+    'import importlib\n'
+    f'for package in {LAZY_PACKAGES!r}:\n'
+    '    module = importlib.import_module(package)\n'
+    '    for name in module.__all__:\n'
+    '        getattr(module, name)\n'
+)
+
+
+def time_invocation(code: str, repeat: int) -> list[float]:
+    """
+    Return the wall-clock times of running code in repeat fresh interpreters, with the repository on the path.
+    """
+    env = {**os.environ, 'PYTHONPATH': os.getcwd()}
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        subprocess.run([sys.executable, '-c', code], check=True, env=env)
+        times.append(perf_counter() - start)
+    return times
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20, help='number of interpreters per invocation')
+    args = parser.parse_args()
+
+    baseline = None
+    print('Startup time (ms): best, median, and best less the empty interpreter, lazily and eagerly imported')
+    print(f'\t{"":20} {"best":>8} {"median":>8} {"lazy":>8} {"eager":>8} {"saved":>8}')
+    for name, code in INVOCATIONS:
+        times = time_invocation(code, args.repeat)
+        best = min(times) * 1000
+        if baseline is None:
+            # The empty interpreter imports nothing, so it has no eager time.
+            baseline = best
+            print(f'\t{name:20} {best:8.1f} {median(times) * 1000:8.1f}')
+            continue
+        eager = min(time_invocation(EAGER_IMPORTS + code, args.repeat)) * 1000
+        print(f'\t{name:20} {best:8.1f} {median(times) * 1000:8.1f} {best - baseline:8.1f} '
+              f'{eager - baseline:8.1f} {eager - best:8.1f}')
+
+
+if __name__ == '__main__':
+    main()
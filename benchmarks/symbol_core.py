@@ -0,0 +1,107 @@
+# Copyright (c) 2024 Sebastian Raaphorst.
+# For license information see LICENSE or https://opensource.org/licenses/BSD-3-Clause
+
+"""
+Microbenchmark of the integer-coded symbol core against the original Enum and match-statement
+implementation, both per symbol operation and per round of a match.
+
+Run from the repository root with:
+    python -m benchmarks.symbol_core
+"""
+
+from collections import Counter
+from timeit import repeat
+from typing import Callable
+import random
+
+from rps.match import Match
+from rps.players import *
+from rps.rps import *
+
+
+def legacy_rps_random(rng: random.Random) -> RPS:
+    return rng.choice(list(RPS))
+
+
+def legacy_rps_beater(rps: RPS) -> RPS:
+    match rps:
+        case RPS.ROCK: return RPS.PAPER
+        case RPS.PAPER: return RPS.SCISSORS
+        case RPS.SCISSORS: return RPS.ROCK
+
+
+def legacy_rps_compare(a: RPS, b: RPS) -> Outcome:
+    match (a, b):
+        case (RPS.ROCK, RPS.PAPER): return Outcome.LOSE
+        case (RPS.ROCK, RPS.SCISSORS): return Outcome.WIN
+        case (RPS.PAPER, RPS.ROCK): return Outcome.WIN
+        case (RPS.PAPER, RPS.SCISSORS): return Outcome.LOSE
+        case (RPS.SCISSORS, RPS.ROCK): return Outcome.LOSE
+        case (RPS.SCISSORS, RPS.PAPER): return Outcome.WIN
+        case _: return Outcome.TIE
+
+
+def legacy_play(match: Match) -> dict[str, Counter[Outcome]]:
+    """
+    The original match loop, on Enum members and the match-statement comparison.
+    The players are driven through their Enum API, which is now a view over their integer-coded API.
+    """
+    match.player1.reset()
+    match.player2.reset()
+    p1_scores: Counter[Outcome] = Counter()
+    p2_scores: Counter[Outcome] = Counter()
+    for round_number in range(match.rounds):
+        move1 = match.player1.next_move(round_number)
+        move2 = match.player2.next_move(round_number)
+        match.player1.record_round(round_number, move1, move2)
+        match.player2.record_round(round_number, move2, move1)
+        p1_scores[legacy_rps_compare(move1, move2)] += 1
+        p2_scores[legacy_rps_compare(move2, move1)] += 1
+    return {match.player1.name: p1_scores, match.player2.name: p2_scores}
+
+
+def best_time(stmt: Callable[[], object], number: int) -> float:
+    """
+    Return the best time per call of stmt in nanoseconds.
+    """
+    return min(repeat(stmt, number=number, repeat=5)) / number * 1e9
+
+
+def main() -> None:
+    rng = random.Random(0)
+    symbols = [rps_random(rng) for _ in range(1000)]
+    codes = [s.code for s in symbols]
+    pairs = list(zip(symbols, reversed(symbols)))
+    code_pairs = list(zip(codes, reversed(codes)))
+
+    print('Per symbol operation (ns):')
+    operations = [
+        ('random', lambda: [legacy_rps_random(rng) for _ in symbols],
+         lambda: [code_random(rng) for _ in symbols]),
+        ('beater', lambda: [legacy_rps_beater(s) for s in symbols],
+         lambda: [BEATER[c] for c in codes]),
+        ('compare', lambda: [legacy_rps_compare(a, b) for a, b in pairs],
+         lambda: [OUTCOMES[(a - b) % 3] for a, b in code_pairs]),
+    ]
+    for name, legacy, coded in operations:
+        legacy_ns = best_time(legacy, 100) / len(symbols)
+        coded_ns = best_time(coded, 100) / len(symbols)
+        print(f'\t{name:8} Enum: {legacy_ns:7.1f}  Codes: {coded_ns:7.1f}  Speedup: {legacy_ns / coded_ns:5.2f}x')
+
+    print('Per round of Match.play (ns):')
+    rounds = 20000
+    pairings = [
+        (PatternPlayer(name='RPS', pattern=[RPS.ROCK, RPS.PAPER, RPS.SCISSORS]), BeatPreviousMovePlayer(name='BPM')),
+        (RandomPlayer(name='Random'), MarkovChainPlayer(name='3-MarkovChain', chain_length=3)),
+        (ConstantPlayer(name='Rock', symbol=RPS.ROCK), DoubleMarkovChainPlayer(name='2-DoubleMarkov', chain_length=2)),
+    ]
+    for p1, p2 in pairings:
+        m = Match(p1, p2, rounds, rng=0)
+        legacy_ns = best_time(lambda: legacy_play(m), 1) / rounds
+        coded_ns = best_time(m.play, 1) / rounds
+        print(f'\t{p1.name + " vs " + p2.name:30} Enum: {legacy_ns:7.1f}  Codes: {coded_ns:7.1f}  '
+              f'Speedup: {legacy_ns / coded_ns:5.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,31 @@
 # Copyright (c) 2024 Sebastian Raaphorst.
 # For license information see LICENSE or https://opensource.org/licenses/BSD-3-Clause
 
+from argparse import ArgumentParser
 from math import ceil, log10
+from time import perf_counter
 
-from rps.common import get_all_pairs
-from rps.match import *
-from rps.players import *
-from rps.rps import *
+from rps.players import (BeatenByPreviousMovePlayer, BeatPreviousMovePlayer, ConstantPlayer, DoubleMarkovChainPlayer,
+                         EnsemblePlayer, MarkovChainPlayer, PatternPlayer, RandomPlayer)
+from rps.rps import Outcome, RPS
+from rps.tournament import Knockout, RoundRobin, SampledPairings, Swiss, Tournament, TournamentFormat
+
+
+def tournament_format(name: str, matches: int) -> TournamentFormat:
+    if name == 'sampled':
+        return SampledPairings(matches)
+    return {'round-robin': RoundRobin, 'swiss': Swiss, 'knockout': Knockout}[name]()
 
 
 def main() -> None:
+    parser = ArgumentParser(description='Play a tournament between the strategies.')
+    parser.add_argument('--format', choices=('round-robin', 'swiss', 'knockout', 'sampled'), default='round-robin')
+    parser.add_argument('--matches', type=int, default=30, help='the number of matches of a sampled tournament')
+    parser.add_argument('--rounds', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
     ensemble_player = EnsemblePlayer(
         name='EnsemblePlayer',
         strategies=[
@@ -41,16 +57,27 @@ def main() -> None:
     ]
 
     nsp = max(len(p.name) for p in players)
-    for p1, p2 in get_all_pairs(players):
-        m = Match(p1, p2, 20000)
-        print(f'***** {p1.name} vs {p2.name} *****')
-        sp = ceil(log10(m.rounds)) + 1
-        scores = m.play()
-        for player, score in scores.items():
+    tournament = Tournament(players, rounds=args.rounds, seed=args.seed, workers=args.workers,
+                            format=tournament_format(args.format, args.matches))
+    sp = ceil(log10(tournament.rounds)) + 1
+
+    # Print the matches as they complete, and the standings at the end.
+    start = perf_counter()
+    total_rounds = 0
+    standings = None
+    for match_result, standings in tournament.stream():
+        total_rounds += match_result.rounds
+        print(f'***** {match_result.player1} vs {match_result.player2} *****')
+        for player, score in match_result.scores.items():
             print(f'\t{player:{nsp}} '
                   f'Wins: {score[Outcome.WIN]:>{sp}} '
                   f'Losses: {score[Outcome.LOSE]:>{sp}} '
                   f'Ties: {score[Outcome.TIE]:>{sp}}')
+    elapsed = perf_counter() - start
+
+    if standings is not None:
+        print(standings.summary())
+    print(f'Played {total_rounds} rounds in {elapsed:.2f}s ({total_rounds / elapsed:,.0f} rounds/s).')
 
 
 if __name__ == '__main__':
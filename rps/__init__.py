@@ -1,2 +1,17 @@
 # Copyright (c) 2024 Sebastian Raaphorst.
 # For license information see LICENSE or https://opensource.org/licenses/BSD-3-Clause
+
+from ._lazy import lazy_attributes
+
+# The subpackages, which are only imported when first used as attributes of the package.
+_registry: dict[str, str] = {
+    'analysis': 'analysis',
+    'common': 'common',
+    'match': 'match',
+    'players': 'players',
+    'rps': 'rps',
+    'tournament': 'tournament',
+}
+
+__all__ = list(_registry)
+__getattr__, __dir__ = lazy_attributes(__name__, _registry)
@@ -0,0 +1,36 @@
+# Copyright (c) 2024 Sebastian Raaphorst.
+# For license information see LICENSE or https://opensource.org/licenses/BSD-3-Clause
+
+from collections.abc import Callable, Mapping
+import importlib
+import sys
+
+# This lives outside rps.common so that importing it does not import anything else in the package.
+__all__ = [
+    'lazy_attributes',
+]
+
+
+def lazy_attributes(package: str,
+                    registry: Mapping[str, str]) -> tuple[Callable[[str], object], Callable[[], list[str]]]:
+    """
+    Return the module __getattr__ and __dir__ for a package whose public names are imported lazily,
+    where the registry maps each name to the submodule of the package that defines it. A submodule is
+    only imported when one of its names is first used, after which the name is cached in the package.
+    A name that maps to itself is a submodule or subpackage, which is imported and returned.
+    """
+    namespace = sys.modules[package].__dict__
+
+    def __getattr__(name: str) -> object:
+        module_name = registry.get(name)
+        if module_name is None:
+            raise AttributeError(f'module {package!r} has no attribute {name!r}')
+        module = importlib.import_module(f'.{module_name}', package)
+        value = module if module_name == name else getattr(module, name)
+        namespace[name] = value
+        return value
+
+    def __dir__() -> list[str]:
+        return sorted(set(namespace) | set(registry))
+
+    return __getattr__, __dir__
@@ -0,0 +1,24 @@
+# Copyright (c) 2024 Sebastian Raaphorst.
+# For license information see LICENSE or https://opensource.org/licenses/BSD-3-Clause
+
+from typing import TYPE_CHECKING
+
+from rps._lazy import lazy_attributes
+
+# The submodule defining each public name, which is only imported when one of its names is first used.
+_registry: dict[str, str] = {
+    'best_response': 'response',
+    'exploitability': 'response',
+    'StateMachine': 'state_machine',
+    'PairAnalysis': 'state_machine',
+    'analyze_pair': 'state_machine',
+    'expected_tally': 'state_machine',
+    'expected_payoff': 'state_machine',
+}
+
+__all__ = list(_registry)
+__getattr__, __dir__ = lazy_attributes(__name__, _registry)
+
+if TYPE_CHECKING:
+    from .response import *
+    from .state_machine import *
@@ -0,0 +1,60 @@
+# Copyright (c) 2024 Sebastian Raaphorst.
+# For license information see LICENSE or https://opensource.org/licenses/BSD-3-Clause
+
+from collections import deque
+from fractions import Fraction
+
+from .state_machine import expected_payoff, expected_tally, StateMachine
+from rps.rps import NUM_SYMBOLS, OUTCOMES
+
+__all__ = [
+    'best_response',
+    'exploitability',
+]
+
+
+def best_response(machine: StateMachine) -> StateMachine:
+    """
+    Return a machine that responds to the given one. A state of the response is the set of states that
+    the machine can be in given the moves so far, and in each state the response plays the move with the
+    best payoff over those states. Once the machine's moves narrow this down to states that play alike,
+    the response wins every round, which is the most that any response can do in the long run.
+
+    If the machine ever plays a move that none of its possible states would, the response starts over
+    from all of its states.
+    """
+    initial = frozenset(machine.initial_states)
+    everything = frozenset(range(machine.num_states))
+    index: dict[frozenset[int], int] = {initial: 0}
+    beliefs: deque[frozenset[int]] = deque([initial])
+    outputs: list[int] = []
+    transitions: list[tuple[int, ...]] = []
+
+    # The states of the response are numbered in the order they are first reached.
+    while beliefs:
+        belief = beliefs.popleft()
+        code = max(range(NUM_SYMBOLS),
+                   key=lambda c: sum(OUTCOMES[(c - machine.outputs[state]) % NUM_SYMBOLS] for state in belief))
+        row = []
+        for opponent_code in range(NUM_SYMBOLS):
+            successor = frozenset(machine.transitions[state][code] for state in belief
+                                  if machine.outputs[state] == opponent_code) or everything
+            if successor not in index:
+                index[successor] = len(index)
+                beliefs.append(successor)
+            row.append(index[successor])
+        outputs.append(code)
+        transitions.append(tuple(row))
+    return StateMachine(outputs=tuple(outputs), transitions=tuple(transitions))
+
+
+def exploitability(machine: StateMachine, rounds: int = 0) -> Fraction:
+    """
+    Return the exact expected payoff per round of best_response against the machine, over a match of a
+    number of rounds, or in the long run if rounds is 0. This is 1 for a machine that is fully exploited.
+    """
+    response = best_response(machine)
+    if rounds == 0:
+        return expected_payoff(response, machine)
+    ties, wins, losses = expected_tally(response, machine, rounds)
+    return (wins - losses) / rounds
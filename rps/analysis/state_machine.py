@@ -0,0 +1,142 @@
+# Copyright (c) 2024 Sebastian Raaphorst.
+# For license information see LICENSE or https://opensource.org/licenses/BSD-3-Clause
+
+from dataclasses import dataclass, field
+from fractions import Fraction
+from itertools import product
+from typing import final, Sequence
+import random
+
+from rps.rps import NUM_SYMBOLS
+
+__all__ = [
+    'StateMachine',
+    'PairAnalysis',
+    'analyze_pair',
+    'expected_tally',
+    'expected_payoff',
+]
+
+
+@final
+@dataclass(frozen=True, slots=True)
+class StateMachine:
+    """
+    A deterministic player as a finite state machine on symbol codes. In each state the player plays
+    the code outputs[state], and after the round it moves to transitions[state][opponent_code].
+
+    A player may start in any of initial_states, with equal probability. The start is drawn as the
+    player draws a random first move, so that a machine started from a player's rng plays exactly as
+    the player would: a single start state draws nothing, and otherwise one is picked by randrange.
+    """
+    outputs: tuple[int, ...]
+    transitions: tuple[tuple[int, ...], ...]
+    initial_states: tuple[int, ...] = (0,)
+
+    def __post_init__(self):
+        if len(self.outputs) != len(self.transitions):
+            raise ValueError(f'State machine has {len(self.outputs)} outputs for {len(self.transitions)} states')
+        if not self.initial_states:
+            raise ValueError('State machine has no initial states.')
+        states = range(self.num_states)
+        if any(code not in range(NUM_SYMBOLS) for code in self.outputs):
+            raise ValueError(f'State machine has illegal outputs: {self.outputs}')
+        if any(len(row) != NUM_SYMBOLS or any(state not in states for state in row) for row in self.transitions):
+            raise ValueError(f'State machine has illegal transitions: {self.transitions}')
+        if any(state not in states for state in self.initial_states):
+            raise ValueError(f'State machine has illegal initial states: {self.initial_states}')
+
+    @property
+    def num_states(self) -> int:
+        return len(self.outputs)
+
+    def start(self, rng: random.Random) -> int:
+        """
+        Draw the state in which to start from rng.
+        """
+        if len(self.initial_states) == 1:
+            return self.initial_states[0]
+        return self.initial_states[rng.randrange(len(self.initial_states))]
+
+
+@final
+@dataclass(frozen=True, slots=True)
+class PairAnalysis:
+    """
+    The exact course of a match between two state machines from given start states. As the pair of
+    states determines the rest of the match, the rounds are a transient prefix followed by a cycle that
+    repeats forever. Each round is kept as its tally index, (move1 - move2) % 3, as in Match.
+    """
+    prefix: tuple[int, ...]
+    cycle: tuple[int, ...]
+
+    # The tallies of the prefix and of one pass through the cycle.
+    _prefix_tally: tuple[int, ...] = field(init=False, repr=False, compare=False)
+    _cycle_tally: tuple[int, ...] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, '_prefix_tally', _tally_of(self.prefix))
+        object.__setattr__(self, '_cycle_tally', _tally_of(self.cycle))
+
+    def tally(self, rounds: int) -> list[int]:
+        """
+        Return the tally of the first rounds of the match, without playing them.
+        """
+        if rounds <= len(self.prefix):
+            return list(_tally_of(self.prefix[:rounds]))
+        full, partial = divmod(rounds - len(self.prefix), len(self.cycle))
+        return [before + full * during + after
+                for before, during, after in zip(self._prefix_tally, self._cycle_tally,
+                                                 _tally_of(self.cycle[:partial]))]
+
+    @property
+    def mean_payoff(self) -> Fraction:
+        """
+        The long-run payoff per round of the first machine, i.e. its wins less its losses per round.
+        """
+        return Fraction(self._cycle_tally[1] - self._cycle_tally[2], len(self.cycle))
+
+
+def _tally_of(indices: Sequence[int]) -> tuple[int, ...]:
+    tally = [0] * NUM_SYMBOLS
+    for index in indices:
+        tally[index] += 1
+    return tuple(tally)
+
+
+def analyze_pair(machine1: StateMachine, machine2: StateMachine, start1: int, start2: int) -> PairAnalysis:
+    """
+    Follow the match between the machines from the start states until a pair of states repeats.
+    This takes at most as many rounds as there are pairs of states.
+    """
+    first_rounds: dict[tuple[int, int], int] = {}
+    indices: list[int] = []
+    state1, state2 = start1, start2
+    while (state1, state2) not in first_rounds:
+        first_rounds[(state1, state2)] = len(indices)
+        code1, code2 = machine1.outputs[state1], machine2.outputs[state2]
+        indices.append((code1 - code2) % NUM_SYMBOLS)
+        state1, state2 = machine1.transitions[state1][code2], machine2.transitions[state2][code1]
+    cycle_start = first_rounds[(state1, state2)]
+    return PairAnalysis(prefix=tuple(indices[:cycle_start]), cycle=tuple(indices[cycle_start:]))
+
+
+def _analyses(machine1: StateMachine, machine2: StateMachine) -> list[PairAnalysis]:
+    return [analyze_pair(machine1, machine2, start1, start2)
+            for start1, start2 in product(machine1.initial_states, machine2.initial_states)]
+
+
+def expected_tally(machine1: StateMachine, machine2: StateMachine, rounds: int) -> list[Fraction]:
+    """
+    Return the exact expected tally of a match of a number of rounds between the machines, over their starts.
+    """
+    analyses = _analyses(machine1, machine2)
+    return [Fraction(sum(counts), len(analyses)) for counts in zip(*(analysis.tally(rounds) for analysis in analyses))]
+
+
+def expected_payoff(machine1: StateMachine, machine2: StateMachine) -> Fraction:
+    """
+    Return the exact expected long-run payoff per round of the first machine against the second.
+    """
+    analyses = _analyses(machine1, machine2)
+    return sum((analysis.mean_payoff for analysis in analyses), Fraction(0)) / len(analyses)
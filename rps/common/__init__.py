@@ -2,25 +2,74 @@
 # For license information see LICENSE or https://opensource.org/licenses/BSD-3-Clause
 
 from itertools import combinations
-from typing import Generator, Mapping, Optional, Sequence, TypeVar
+from typing import Any, Generator, Mapping, Optional, Sequence, TypeVar, Union
 import random
 
+from .sampling import *
+
 __all__ = [
+    'AliasTable',
+    'RandomSource',
     'get_all_pairs',
+    'make_rng',
     'probability_selector',
+    'spawn_rngs',
+    'split_rng',
 ]
 
 
 T = TypeVar('T')
 
+# Anything that can be turned into a random.Random by make_rng:
+# * None for an independently seeded stream;
+# * an int seed;
+# * a random.Random, which is used as is; or
+# * a NumPy Generator, from which a seed is drawn.
+RandomSource = Union[None, int, random.Random, Any]
+
 
 def get_all_pairs(seq: Sequence[T]) -> Generator[tuple[T, T], None, None]:
     for pair in combinations(seq, 2):
         yield pair
 
 
-def probability_selector(probability_map: Mapping[T, float]) -> Optional[T]:
-    prob = random.random()
+def make_rng(source: RandomSource = None) -> random.Random:
+    """
+    Convert a RandomSource into a random.Random.
+    NumPy Generators are duck-typed so that NumPy is not required.
+    """
+    if isinstance(source, random.Random):
+        return source
+    if source is None or isinstance(source, int):
+        return random.Random(source)
+    if hasattr(source, 'integers'):
+        return random.Random(int(source.integers(2 ** 63)))
+    raise TypeError(f'Cannot create a random number generator from: {source!r}')
+
+
+def split_rng(rng: random.Random) -> random.Random:
+    """
+    Deterministically derive a new, independent stream from rng, advancing rng.
+    """
+    return random.Random(rng.getrandbits(64))
+
+
+def spawn_rngs(source: RandomSource, count: int) -> list[random.Random]:
+    """
+    Deterministically derive count independent streams from a master source.
+    The i-th stream depends only on the master seed and i, so work using these streams can be sharded
+    across threads or processes and still give identical results.
+    """
+    master = make_rng(source)
+    return [split_rng(master) for _ in range(count)]
+
+
+def probability_selector(probability_map: Mapping[T, float],
+                         rng: Optional[random.Random] = None) -> Optional[T]:
+    """
+    Select a key with the probability it maps to, using rng if given and the global random module if not.
+    """
+    prob = (rng if rng is not None else random).random()
     cumulative = 0
     for key, value in probability_map.items():
         cumulative += value
@@ -0,0 +1,80 @@
+# Copyright (c) 2024 Sebastian Raaphorst.
+# For license information see LICENSE or https://opensource.org/licenses/BSD-3-Clause
+
+from dataclasses import dataclass
+from typing import final, Generic, Mapping, TypeVar
+import random
+
+__all__ = [
+    'AliasTable',
+]
+
+
+T = TypeVar('T')
+
+
+@final
+@dataclass(frozen=True)
+class AliasTable(Generic[T]):
+    """
+    A fixed distribution over outcomes, preprocessed with Vose's alias method so that a sample takes
+    a single uniform draw and constant time, however many outcomes there are.
+
+    Sample i = floor(u * n) for u uniform in [0, 1): keep outcome i if the fractional part of u * n is
+    below probabilities[i], and otherwise take outcome aliases[i].
+    """
+    outcomes: tuple[T, ...]
+    probabilities: tuple[float, ...]
+    aliases: tuple[int, ...]
+
+    @staticmethod
+    def from_mapping(probability_map: Mapping[T, float]) -> 'AliasTable[T]':
+        """
+        Build the table for a map from outcomes to their probabilities, which are normalized.
+        """
+        outcomes = tuple(probability_map)
+        total = sum(probability_map.values())
+        if not outcomes or total <= 0:
+            raise ValueError(f'Cannot sample from probability map: {probability_map}')
+
+        n = len(outcomes)
+        scaled = [probability_map[outcome] * n / total for outcome in outcomes]
+        probabilities = [1.0] * n
+        aliases = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            probabilities[less] = scaled[less]
+            aliases[less] = more
+            scaled[more] += scaled[less] - 1.0
+            (small if scaled[more] < 1.0 else large).append(more)
+
+        # Anything left over is 1 up to rounding, and so always keeps its own outcome.
+        return AliasTable(outcomes=outcomes, probabilities=tuple(probabilities), aliases=tuple(aliases))
+
+    def sample(self, rng: random.Random) -> T:
+        """
+        Draw one outcome.
+        """
+        u = rng.random() * len(self.outcomes)
+        index = int(u)
+        return self.outcomes[index] if u - index < self.probabilities[index] else self.outcomes[self.aliases[index]]
+
+    def sample_many(self, rng: random.Random, count: int) -> list[T]:
+        """
+        Draw count outcomes in one call, with the lookups hoisted out of the loop. This draws exactly
+        as count calls to sample do.
+        """
+        n = len(self.outcomes)
+        outcomes = self.outcomes
+        probabilities = self.probabilities
+        aliases = self.aliases
+        draw = rng.random
+        samples = []
+        for _ in range(count):
+            u = draw() * n
+            index = int(u)
+            samples.append(outcomes[index] if u - index < probabilities[index] else outcomes[aliases[index]])
+        return samples
@@ -1,46 +1,52 @@
 # Copyright (c) 2024 Sebastian Raaphorst.
 # For license information see LICENSE or https://opensource.org/licenses/BSD-3-Clause
 
-from collections import Counter
-from dataclasses import dataclass
-from typing import final, Final
-
-from rps.players import AbstractPlayer
-from rps.rps import rps_compare, Outcome
-
-default_rounds: Final[int] = 1000
-
-
-@final
-@dataclass
-class Match:
-    player1: AbstractPlayer
-    player2: AbstractPlayer
-    rounds: int = default_rounds
-
-    def __post_init__(self):
-        if self.player1.name == self.player2.name:
-            raise ValueError(f'Players have the same name: "{self.player1.name}"')
-
-    def play(self) -> dict[str, Counter[Outcome]]:
-        """
-        Return the scores for each of the two players by their name.
-        """
-        # Reset the players.
-        self.player1.reset()
-        self.player2.reset()
-
-        # Reset the Counter.
-        p1_scores: Counter[Outcome] = Counter()
-        p2_scores: Counter[Outcome] = Counter()
-
-        for round_number in range(self.rounds):
-            move1 = self.player1.next_move(round_number)
-            move2 = self.player2.next_move(round_number)
-            self.player1.record_round(round_number, move1, move2)
-            self.player2.record_round(round_number, move2, move1)
-
-            p1_scores[rps_compare(move1, move2)] += 1
-            p2_scores[rps_compare(move2, move1)] += 1
-
-        return {self.player1.name: p1_scores, self.player2.name: p2_scores}
+from typing import TYPE_CHECKING
+
+from rps._lazy import lazy_attributes
+
+# The submodule defining each public name. Submodules are only imported when one of their names is
+# first used, so that e.g. a single match does not pay for importing asyncio for AsyncMatch.
+_registry: dict[str, str] = {
+    'AsyncPlayer': 'async_match',
+    'AsyncMatch': 'async_match',
+    'LocalAsyncPlayer': 'async_match',
+    'MoveTimeoutError': 'async_match',
+    'ProtocolError': 'async_match',
+    'StreamAsyncPlayer': 'async_match',
+    'connect_tcp_player': 'async_match',
+    'connect_unix_player': 'async_match',
+    'run_matches': 'async_match',
+    'serve_player': 'async_match',
+    'serve_stdio': 'async_match',
+    'start_player_server': 'async_match',
+    'start_subprocess_player': 'async_match',
+    'Instrumentation': 'instrumentation',
+    'LatencyHistogram': 'instrumentation',
+    'PlayerProfile': 'instrumentation',
+    'LaneMatch': 'lane_match',
+    'default_rounds': 'match',
+    'Match': 'match',
+    'MatchLog': 'match_log',
+    'MatchLogWriter': 'match_log',
+    'record_match': 'match_log',
+    'SequentialProbabilityRatioTest': 'stopping',
+    'StoppingRule': 'stopping',
+    'WilsonIntervalRule': 'stopping',
+    'RoundRecord': 'streaming',
+    'chunked': 'streaming',
+    'score_curve': 'streaming',
+    'write_csv': 'streaming',
+}
+
+__all__ = list(_registry)
+__getattr__, __dir__ = lazy_attributes(__name__, _registry)
+
+if TYPE_CHECKING:
+    from .async_match import *
+    from .instrumentation import *
+    from .lane_match import *
+    from .match import *
+    from .match_log import *
+    from .stopping import *
+    from .streaming import *
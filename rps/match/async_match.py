@@ -0,0 +1,329 @@
+# Copyright (c) 2024 Sebastian Raaphorst.
+# For license information see LICENSE or https://opensource.org/licenses/BSD-3-Clause
+
+from abc import ABC, abstractmethod
+from collections import Counter
+from dataclasses import dataclass
+from typing import final, Callable, Iterable, Optional, TextIO
+import asyncio
+import sys
+
+from .match import default_rounds, _scores_from_tally
+from rps.players import AbstractPlayer
+from rps.rps import NUM_SYMBOLS, Outcome, RPS
+
+__all__ = [
+    'AsyncPlayer',
+    'AsyncMatch',
+    'LocalAsyncPlayer',
+    'MoveTimeoutError',
+    'ProtocolError',
+    'StreamAsyncPlayer',
+    'connect_tcp_player',
+    'connect_unix_player',
+    'run_matches',
+    'serve_player',
+    'serve_stdio',
+    'start_player_server',
+    'start_subprocess_player',
+]
+
+# The line protocol spoken with remote bots, where the moves are the symbol values R, P, and S:
+# * RESET                           the bot resets its player; no reply.
+# * MOVE <round>                    the bot replies with its move.
+# * RECORD <round> <mine> <theirs>  the bot records the round; no reply.
+# * QUIT                            the bot closes the connection; no reply.
+# Blank lines are ignored, and the bot replies to anything else with ERROR <reason>, which the other
+# side sees as a ProtocolError in place of the next move.
+_CODES: dict[str, int] = {sym.value: sym.code for sym in RPS}
+_VALUES: tuple[str, ...] = tuple(sym.value for sym in RPS)
+
+# The number of arguments of each command.
+_ARITIES: dict[str, int] = {'RESET': 0, 'MOVE': 1, 'RECORD': 3, 'QUIT': 0}
+
+
+class MoveTimeoutError(asyncio.TimeoutError):
+    """
+    Raised when a player does not make its move within the move timeout. A remote player that timed out
+    is closed, as its late reply would be taken for its next move, and cannot be reused.
+    """
+    def __init__(self, name: str, round_number: int):
+        super().__init__(f'Player {name} timed out in round {round_number}.')
+        self.name = name
+        self.round_number = round_number
+
+
+class ProtocolError(RuntimeError):
+    """
+    Raised when a remote bot replies with something other than a move, or when a remote player is used
+    after waiting for a move was abandoned.
+    """
+    pass
+
+
+class AsyncPlayer(ABC):
+    """
+    An awaitable player, which may be in-process or a remote bot.
+    """
+    name: str
+
+    @abstractmethod
+    async def reset(self) -> None:
+        pass
+
+    @abstractmethod
+    async def next_code(self, round_number: int) -> int:
+        pass
+
+    @abstractmethod
+    async def record_codes(self, round_number: int, player_code: int, opponent_code: int) -> None:
+        pass
+
+    async def close(self) -> None:
+        """
+        Release any resources held by the player.
+        """
+        pass
+
+
+@final
+class LocalAsyncPlayer(AsyncPlayer):
+    """
+    An adapter of an in-process player.
+    """
+    def __init__(self, player: AbstractPlayer):
+        self.player = player
+        self.name = player.name
+
+    async def reset(self) -> None:
+        self.player.reset()
+
+    async def next_code(self, round_number: int) -> int:
+        return self.player.next_code(round_number)
+
+    async def record_codes(self, round_number: int, player_code: int, opponent_code: int) -> None:
+        self.player.record_codes(round_number, player_code, opponent_code)
+
+
+class StreamAsyncPlayer(AsyncPlayer):
+    """
+    An adapter of a remote bot speaking the line protocol over a pair of streams, e.g. a socket or the
+    pipes of a subprocess. Writes wait for the transport to drain, so a slow bot applies backpressure
+    instead of letting its buffer grow without bound.
+
+    If waiting for a move is cancelled, e.g. by a move timeout, the reply may still arrive and would be
+    read as the next move, so the player closes its connection, and any later command raises a ProtocolError.
+    """
+    def __init__(self, name: str, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.name = name
+        self._reader = reader
+        self._writer = writer
+
+        # Whether waiting for a move was abandoned, leaving the replies out of step with the commands.
+        self._abandoned = False
+
+    async def _send(self, line: str) -> None:
+        if self._abandoned:
+            raise ProtocolError(f'Player {self.name} was abandoned while making a move, and cannot be reused.')
+        self._writer.write(f'{line}\n'.encode())
+        await self._writer.drain()
+
+    async def reset(self) -> None:
+        await self._send('RESET')
+
+    async def next_code(self, round_number: int) -> int:
+        await self._send(f'MOVE {round_number}')
+        try:
+            line = await self._reader.readline()
+        except asyncio.CancelledError:
+            self._abandoned = True
+            self._writer.close()
+            raise
+        reply = line.decode().strip()
+        code = _CODES.get(reply)
+        if code is None:
+            raise ProtocolError(f'Player {self.name} replied with an illegal move in round {round_number}: {reply!r}')
+        return code
+
+    async def record_codes(self, round_number: int, player_code: int, opponent_code: int) -> None:
+        await self._send(f'RECORD {round_number} {_VALUES[player_code]} {_VALUES[opponent_code]}')
+
+    async def close(self) -> None:
+        if not self._writer.is_closing():
+            try:
+                await self._send('QUIT')
+            except ConnectionError:
+                pass
+            self._writer.close()
+        await self._writer.wait_closed()
+
+
+@final
+class _SubprocessAsyncPlayer(StreamAsyncPlayer):
+    """
+    A remote bot running in a subprocess, talking over its stdin and stdout.
+    """
+    def __init__(self, name: str, process: asyncio.subprocess.Process):
+        super().__init__(name, process.stdout, process.stdin)
+        self._process = process
+
+    async def close(self) -> None:
+        await super().close()
+        await self._process.wait()
+
+
+async def start_subprocess_player(name: str, *args: str) -> StreamAsyncPlayer:
+    """
+    Start a bot as a subprocess with the given command line, e.g. one that calls serve_stdio.
+    """
+    process = await asyncio.create_subprocess_exec(*args, stdin=asyncio.subprocess.PIPE,
+                                                   stdout=asyncio.subprocess.PIPE)
+    return _SubprocessAsyncPlayer(name, process)
+
+
+async def connect_tcp_player(name: str, host: str, port: int) -> StreamAsyncPlayer:
+    """
+    Connect to a bot listening on a TCP socket, e.g. one started with start_player_server.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    return StreamAsyncPlayer(name, reader, writer)
+
+
+async def connect_unix_player(name: str, path: str) -> StreamAsyncPlayer:
+    """
+    Connect to a bot listening on a Unix domain socket.
+    """
+    reader, writer = await asyncio.open_unix_connection(path)
+    return StreamAsyncPlayer(name, reader, writer)
+
+
+@final
+@dataclass
+class AsyncMatch:
+    """
+    A match between two awaitable players, where each round asks both players for their moves
+    concurrently. If move_timeout is set, a player that takes longer than move_timeout seconds to make
+    a move loses the match by a MoveTimeoutError. A remote player that timed out cannot be reused.
+    """
+    player1: AsyncPlayer
+    player2: AsyncPlayer
+    rounds: int = default_rounds
+    move_timeout: Optional[float] = None
+
+    def __post_init__(self):
+        if self.player1.name == self.player2.name:
+            raise ValueError(f'Players have the same name: "{self.player1.name}"')
+
+    async def _next_code(self, player: AsyncPlayer, round_number: int) -> int:
+        # An in-process player makes its move without yielding to the event loop, so it cannot time out,
+        # and creating a task for wait_for would only slow it down.
+        if self.move_timeout is None or isinstance(player, LocalAsyncPlayer):
+            return await player.next_code(round_number)
+        try:
+            return await asyncio.wait_for(player.next_code(round_number), self.move_timeout)
+        except asyncio.TimeoutError as e:
+            raise MoveTimeoutError(player.name, round_number) from e
+
+    async def play(self) -> dict[str, Counter[Outcome]]:
+        """
+        Return the scores for each of the two players by their name.
+        """
+        await self.player1.reset()
+        await self.player2.reset()
+
+        # Only wait for the moves concurrently if both players may actually wait, i.e. are not in-process,
+        # as gathering creates a task per move. Recording never waits for a reply.
+        concurrent = not (isinstance(self.player1, LocalAsyncPlayer) or isinstance(self.player2, LocalAsyncPlayer))
+        tally = [0] * NUM_SYMBOLS
+        for round_number in range(self.rounds):
+            if concurrent:
+                move1, move2 = await asyncio.gather(self._next_code(self.player1, round_number),
+                                                    self._next_code(self.player2, round_number))
+            else:
+                move1 = await self._next_code(self.player1, round_number)
+                move2 = await self._next_code(self.player2, round_number)
+            await self.player1.record_codes(round_number, move1, move2)
+            await self.player2.record_codes(round_number, move2, move1)
+            tally[(move1 - move2) % NUM_SYMBOLS] += 1
+
+        return {self.player1.name: _scores_from_tally(tally),
+                self.player2.name: _scores_from_tally(tally, mirror=True)}
+
+
+async def run_matches(matches: Iterable[AsyncMatch],
+                      max_concurrency: int = 1000) -> list[dict[str, Counter[Outcome]] | BaseException]:
+    """
+    Play many matches concurrently on the running event loop, with at most max_concurrency in flight
+    at a time, and return their scores, or the exception that ended them, in order.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def play(match: AsyncMatch) -> dict[str, Counter[Outcome]]:
+        async with semaphore:
+            return await match.play()
+
+    return await asyncio.gather(*(play(match) for match in matches), return_exceptions=True)
+
+
+def _serve_line(player: AbstractPlayer, line: str) -> tuple[Optional[str], bool]:
+    """
+    Carry out a command of the line protocol for a player, returning the reply, if any, and whether
+    to stop serving. A malformed command gets an error reply rather than ending the session.
+    """
+    words = line.split()
+    if not words:
+        return None, False
+    command, *args = words
+    if command not in _ARITIES:
+        return f'ERROR unknown command: {line.strip()}', False
+    if len(args) != _ARITIES[command]:
+        return f'ERROR malformed command: {line.strip()}', False
+    try:
+        if command == 'MOVE':
+            return _VALUES[player.next_code(int(args[0]))], False
+        if command == 'RECORD':
+            player.record_codes(int(args[0]), _CODES[args[1]], _CODES[args[2]])
+    except (ValueError, KeyError):
+        return f'ERROR malformed command: {line.strip()}', False
+    if command == 'RESET':
+        player.reset()
+    return None, command == 'QUIT'
+
+
+async def serve_player(player: AbstractPlayer, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """
+    Serve a player over a pair of streams with the line protocol until QUIT or the end of the stream.
+    """
+    try:
+        while line := (await reader.readline()).decode():
+            reply, stop = _serve_line(player, line)
+            if stop:
+                break
+            if reply is not None:
+                writer.write(f'{reply}\n'.encode())
+                await writer.drain()
+    finally:
+        writer.close()
+
+
+async def start_player_server(player_factory: Callable[[], AbstractPlayer], host: str = '127.0.0.1',
+                              port: int = 0) -> asyncio.Server:
+    """
+    Start a TCP server that serves a fresh player from player_factory on each connection.
+    """
+    return await asyncio.start_server(lambda reader, writer: serve_player(player_factory(), reader, writer),
+                                      host, port)
+
+
+def serve_stdio(player: AbstractPlayer, stdin: TextIO = sys.stdin, stdout: TextIO = sys.stdout) -> None:
+    """
+    Serve a player with the line protocol over stdin and stdout, for bots run as subprocesses.
+    This blocks, as there is nothing else for such a bot to do.
+    """
+    for line in stdin:
+        reply, stop = _serve_line(player, line)
+        if stop:
+            break
+        if reply is not None:
+            stdout.write(f'{reply}\n')
+            stdout.flush()
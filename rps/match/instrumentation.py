@@ -0,0 +1,155 @@
+# Copyright (c) 2024 Sebastian Raaphorst.
+# For license information see LICENSE or https://opensource.org/licenses/BSD-3-Clause
+
+from dataclasses import dataclass, field
+from typing import final, Any, Final, Iterable
+import json
+
+__all__ = [
+    'Instrumentation',
+    'LatencyHistogram',
+    'PlayerProfile',
+]
+
+# Latencies are bucketed by their bit length in nanoseconds, so bucket i holds the calls that took
+# from 2^(i-1) up to 2^i - 1 nanoseconds, and bucket 0 those that took no measurable time.
+_NUM_BUCKETS: Final[int] = 64
+
+
+@final
+@dataclass
+class LatencyHistogram:
+    """
+    A histogram of the latencies of calls to a method, in power of two buckets of nanoseconds.
+    """
+    buckets: list[int] = field(default_factory=lambda: [0] * _NUM_BUCKETS)
+    calls: int = 0
+    total_ns: int = 0
+    max_ns: int = 0
+
+    def add(self, ns: int) -> None:
+        self.buckets[ns.bit_length()] += 1
+        self.calls += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def merge(self, other: 'LatencyHistogram') -> None:
+        for index, count in enumerate(other.buckets):
+            self.buckets[index] += count
+        self.calls += other.calls
+        self.total_ns += other.total_ns
+        self.max_ns = max(self.max_ns, other.max_ns)
+
+    @property
+    def mean_ns(self) -> float:
+        return self.total_ns / self.calls if self.calls else 0.0
+
+    def quantile(self, q: float) -> int:
+        """
+        An upper bound in nanoseconds on the q-th quantile of the latencies, which is the upper edge
+        of the bucket containing it.
+        """
+        if not 0 <= q <= 1:
+            raise ValueError(f'Illegal quantile: {q}')
+        if not self.calls:
+            return 0
+        rank = q * self.calls
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= rank:
+                return min((1 << index) - 1, self.max_ns)
+        return self.max_ns
+
+    def to_dict(self) -> dict[str, Any]:
+        # Only the non-empty buckets are kept, keyed by their upper edge.
+        return {'calls': self.calls,
+                'total_ns': self.total_ns,
+                'mean_ns': self.mean_ns,
+                'p50_ns': self.quantile(0.5),
+                'p99_ns': self.quantile(0.99),
+                'max_ns': self.max_ns,
+                'buckets': {str((1 << index) - 1): count for index, count in enumerate(self.buckets) if count}}
+
+
+@final
+@dataclass
+class PlayerProfile:
+    """
+    The profile of a single player: the latencies of its calls to next_code and record_codes, and the
+    net number of memory blocks that the calls retained, i.e. the change in sys.getallocatedblocks over
+    each call. This is not a count of allocations: a block allocated and freed within a call is not
+    counted, so a player that allocates freely but keeps nothing shows close to 0. It is how much the
+    player grows, e.g. by a count table or history that is never bounded.
+    """
+    next_code: LatencyHistogram = field(default_factory=LatencyHistogram)
+    record_codes: LatencyHistogram = field(default_factory=LatencyHistogram)
+    net_retained_blocks: int = 0
+
+    def merge(self, other: 'PlayerProfile') -> None:
+        self.next_code.merge(other.next_code)
+        self.record_codes.merge(other.record_codes)
+        self.net_retained_blocks += other.net_retained_blocks
+
+    @property
+    def total_ns(self) -> int:
+        return self.next_code.total_ns + self.record_codes.total_ns
+
+    def to_dict(self) -> dict[str, Any]:
+        return {'next_code': self.next_code.to_dict(),
+                'record_codes': self.record_codes.to_dict(),
+                'net_retained_blocks': self.net_retained_blocks}
+
+
+@final
+@dataclass
+class Instrumentation:
+    """
+    Profiles of players by name, collected by matches played with instrumentation set.
+    Profiles from several matches, e.g. those of a tournament, are combined with merge.
+    """
+    profiles: dict[str, PlayerProfile] = field(default_factory=dict)
+
+    def profile(self, name: str) -> PlayerProfile:
+        """
+        The profile of the named player, which is created if it does not exist.
+        """
+        profile = self.profiles.get(name)
+        if profile is None:
+            profile = self.profiles[name] = PlayerProfile()
+        return profile
+
+    def merge(self, other: 'Instrumentation') -> None:
+        for name, profile in other.profiles.items():
+            self.profile(name).merge(profile)
+
+    @staticmethod
+    def merged(instrumentations: Iterable['Instrumentation']) -> 'Instrumentation':
+        result = Instrumentation()
+        for instrumentation in instrumentations:
+            result.merge(instrumentation)
+        return result
+
+    def summary(self) -> str:
+        """
+        A table of the players, slowest first by their total time.
+        """
+        rows = sorted(self.profiles.items(), key=lambda item: item[1].total_ns, reverse=True)
+        width = max([len('Player')] + [len(name) for name in self.profiles])
+        lines = [f'{"Player":{width}} {"Total ms":>10} '
+                 f'{"move mean ns":>12} {"move p99 ns":>12} {"move max ns":>12} '
+                 f'{"record mean ns":>14} {"record p99 ns":>14} {"retained":>8}']
+        for name, profile in rows:
+            lines.append(f'{name:{width}} {profile.total_ns / 1e6:>10.2f} '
+                         f'{profile.next_code.mean_ns:>12.0f} {profile.next_code.quantile(0.99):>12} '
+                         f'{profile.next_code.max_ns:>12} '
+                         f'{profile.record_codes.mean_ns:>14.0f} {profile.record_codes.quantile(0.99):>14} '
+                         f'{profile.net_retained_blocks:>8}')
+        return '\n'.join(lines)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {name: profile.to_dict() for name, profile in self.profiles.items()}
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.to_dict(), **kwargs)
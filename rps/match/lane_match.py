@@ -0,0 +1,78 @@
+# Copyright (c) 2024 Sebastian Raaphorst.
+# For license information see LICENSE or https://opensource.org/licenses/BSD-3-Clause
+
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import final, Optional, TYPE_CHECKING
+
+from .match import default_rounds, _scores_from_tally
+from rps.common import make_rng, RandomSource, split_rng
+from rps.players.lanes import LanePlayer
+from rps.rps import NUM_SYMBOLS, Outcome
+
+if TYPE_CHECKING:
+    import numpy as np
+
+__all__ = ['LaneMatch']
+
+
+@final
+@dataclass
+class LaneMatch:
+    """
+    Independent matches of a number of rounds in each of the lanes of two lane players, played at once.
+    To play a strategy against a population, pair its lane version with PlayerLanes for the population.
+
+    If rng is given, each play gives each player a fresh stream split from it, as Match does.
+    """
+    player1: LanePlayer
+    player2: LanePlayer
+    rounds: int = default_rounds
+    rng: RandomSource = field(default=None, repr=False, compare=False)
+    reset: bool = True
+
+    # The tally of the last play of the match.
+    tally: Optional['np.ndarray'] = field(init=False, default=None, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.player1.name == self.player2.name:
+            raise ValueError(f'Players have the same name: "{self.player1.name}"')
+        if self.player1.lanes != self.player2.lanes:
+            raise ValueError(f'Players have different numbers of lanes: {self.player1.lanes} and {self.player2.lanes}')
+
+    def play(self) -> 'np.ndarray':
+        """
+        Return an array with a row per lane tallying its rounds by (move1 - move2) % 3, so that the
+        columns count the ties, and the wins and losses of player1.
+        """
+        import numpy as np
+        if self.rng is not None:
+            rng = make_rng(self.rng)
+            self.player1.set_rng(split_rng(rng))
+            self.player2.set_rng(split_rng(rng))
+        if self.reset:
+            self.player1.reset()
+            self.player2.reset()
+
+        # Fancy indexing adds correctly here for the reason given in BaseMarkovChainLanes.record_codes.
+        lanes = np.arange(self.player1.lanes)
+        tally = np.zeros((self.player1.lanes, NUM_SYMBOLS), dtype=np.int64)
+        for round_number in range(self.rounds):
+            moves1 = self.player1.next_codes(round_number)
+            moves2 = self.player2.next_codes(round_number)
+            tally[lanes, (moves1 - moves2) % NUM_SYMBOLS] += 1
+            self.player1.record_codes(round_number, moves1, moves2)
+            self.player2.record_codes(round_number, moves2, moves1)
+        self.tally = tally
+        return tally
+
+    def scores(self) -> list[dict[str, Counter[Outcome]]]:
+        """
+        Return the scores of the last play for each of the two players by their name, for each lane,
+        as Match.play does.
+        """
+        if self.tally is None:
+            raise ValueError('Match has not been played.')
+        return [{self.player1.name: _scores_from_tally(row),
+                 self.player2.name: _scores_from_tally(row, mirror=True)}
+                for row in self.tally.tolist()]
@@ -0,0 +1,233 @@
+# Copyright (c) 2024 Sebastian Raaphorst.
+# For license information see LICENSE or https://opensource.org/licenses/BSD-3-Clause
+
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import cache
+from importlib.util import find_spec
+from time import perf_counter_ns
+from typing import final, Callable, Final, Iterator, Optional, TYPE_CHECKING
+import sys
+
+from .streaming import RoundRecord
+from rps.common import make_rng, RandomSource, split_rng
+from rps.players import AbstractPlayer, BatchPlayer
+from rps.rps import NUM_SYMBOLS, Outcome, OUTCOMES, SYMBOLS
+
+if TYPE_CHECKING:
+    from .instrumentation import Instrumentation
+    from .stopping import StoppingRule
+
+__all__ = [
+    'default_rounds',
+    'Match',
+]
+
+default_rounds: Final[int] = 1000
+
+
+@final
+@dataclass
+class Match:
+    """
+    A match of a number of rounds between two players.
+
+    If rng is given, each play of the match gives each player a fresh stream split from it, so that
+    a match with an int seed is reproducible. Otherwise, the players use their own streams.
+
+    If vectorized is set, both players are batch players, and NumPy is available, the moves for the
+    whole match are produced at once and scored with array operations. This is the default. As batch
+    players produce exactly the moves they would play round by round, a seeded match has the same
+    result either way, so vectorized only trades speed for the per-round calls to the players.
+
+    If instrumentation is set, the match is always played round by round, and the latency of every
+    call to the players and the memory blocks they allocate are recorded into it. Otherwise, playing
+    the match pays nothing for the instrumentation.
+
+    If reset is not set, the players are not reset before the match, so that players restored from a
+    snapshot or trained in earlier matches keep what they have learned.
+
+    If stopping_rule is set, the match is played in blocks of its check interval, and stops early once
+    the rule decides that the result is settled. The number of rounds played is kept in rounds_played.
+    """
+    player1: AbstractPlayer
+    player2: AbstractPlayer
+    rounds: int = default_rounds
+    rng: RandomSource = field(default=None, repr=False, compare=False)
+    vectorized: bool = True
+    instrumentation: Optional['Instrumentation'] = field(default=None, repr=False, compare=False)
+    stopping_rule: Optional['StoppingRule'] = None
+    reset: bool = True
+
+    # The number of rounds played by the last play of the match.
+    rounds_played: int = field(init=False, default=0, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.player1.name == self.player2.name:
+            raise ValueError(f'Players have the same name: "{self.player1.name}"')
+
+    def _prepare(self) -> None:
+        """
+        Seed and reset the players.
+        """
+        if self.rng is not None:
+            rng = make_rng(self.rng)
+            self.player1.set_rng(split_rng(rng))
+            self.player2.set_rng(split_rng(rng))
+        if self.reset:
+            self.player1.reset()
+            self.player2.reset()
+
+    def play(self) -> dict[str, Counter[Outcome]]:
+        """
+        Return the scores for each of the two players by their name.
+        """
+        self._prepare()
+        if self.instrumentation is not None:
+            play_rounds = self._play_instrumented
+        elif self._can_vectorize():
+            play_rounds = self._play_vectorized
+        else:
+            play_rounds = self._play_rounds
+
+        if self.stopping_rule is None:
+            tally = play_rounds(0, self.rounds)
+        else:
+            tally = self._play_adaptively(play_rounds)
+        self.rounds_played = sum(tally)
+
+        return {self.player1.name: _scores_from_tally(tally),
+                self.player2.name: _scores_from_tally(tally, mirror=True)}
+
+    def _can_vectorize(self) -> bool:
+        return (self.vectorized and
+                isinstance(self.player1, BatchPlayer) and
+                isinstance(self.player2, BatchPlayer) and
+                _has_numpy())
+
+    def _play_adaptively(self, play_rounds: Callable[[int, int], list[int]]) -> list[int]:
+        """
+        Play the match in blocks until the stopping rule is satisfied or the rounds run out.
+        """
+        tally = [0] * NUM_SYMBOLS
+        for start in range(0, self.rounds, self.stopping_rule.check_interval):
+            block = play_rounds(start, min(start + self.stopping_rule.check_interval, self.rounds))
+            for index, count in enumerate(block):
+                tally[index] += count
+            if self.stopping_rule.should_stop(wins=tally[1], losses=tally[2], ties=tally[0]):
+                break
+        return tally
+
+    def _play_vectorized(self, start: int, stop: int) -> list[int]:
+        """
+        Score the rounds in [start, stop) at once, tallying the rounds by (move1 - move2) % 3.
+        """
+        import numpy as np
+        moves1 = self.player1.next_codes(start, stop - start).astype(np.int8, copy=False)
+        moves2 = self.player2.next_codes(start, stop - start).astype(np.int8, copy=False)
+
+        # Counting matches is much faster than reducing modulo 3 and calling bincount.
+        difference = moves1 - moves2
+        ties = int(np.count_nonzero(difference == 0))
+        wins = int(np.count_nonzero((difference == 1) | (difference == 1 - NUM_SYMBOLS)))
+        return [ties, wins, stop - start - ties - wins]
+
+    def _play_rounds(self, start: int, stop: int) -> list[int]:
+        """
+        Play the rounds in [start, stop) one by one, tallying the rounds by (move1 - move2) % 3.
+        """
+        # Bind the methods up front to avoid the attribute lookups per round.
+        tally = [0] * NUM_SYMBOLS
+        next_code1 = self.player1.next_code
+        next_code2 = self.player2.next_code
+        record_codes1 = self.player1.record_codes
+        record_codes2 = self.player2.record_codes
+
+        for round_number in range(start, stop):
+            move1 = next_code1(round_number)
+            move2 = next_code2(round_number)
+            record_codes1(round_number, move1, move2)
+            record_codes2(round_number, move2, move1)
+            tally[(move1 - move2) % NUM_SYMBOLS] += 1
+
+        return tally
+
+    def _play_instrumented(self, start: int, stop: int) -> list[int]:
+        """
+        Play the match round by round as _play_rounds does, timing each call to the players.
+        """
+        tally = [0] * NUM_SYMBOLS
+        profile1 = self.instrumentation.profile(self.player1.name)
+        profile2 = self.instrumentation.profile(self.player2.name)
+        players = ((self.player1, profile1), (self.player2, profile2))
+        clock = perf_counter_ns
+        blocks = sys.getallocatedblocks
+
+        for round_number in range(start, stop):
+            moves = []
+            for player, profile in players:
+                blocks_before = blocks()
+                t0 = clock()
+                move = player.next_code(round_number)
+                profile.next_code.add(clock() - t0)
+                profile.net_retained_blocks += blocks() - blocks_before
+                moves.append(move)
+
+            move1, move2 = moves
+            for (player, profile), (move, other) in zip(players, ((move1, move2), (move2, move1))):
+                blocks_before = blocks()
+                t0 = clock()
+                player.record_codes(round_number, move, other)
+                profile.record_codes.add(clock() - t0)
+                profile.net_retained_blocks += blocks() - blocks_before
+
+            tally[(move1 - move2) % NUM_SYMBOLS] += 1
+
+        return tally
+
+    def stream(self) -> Iterator[RoundRecord]:
+        """
+        Play the match lazily, yielding a record of each round as it is played.
+        The match is always played round by round, exactly as play does when vectorized is not set,
+        and nothing is kept between rounds but the tally, so arbitrarily long matches can be consumed
+        in bounded memory. A stopping rule is honoured as in play.
+        """
+        self._prepare()
+        self.rounds_played = 0
+        next_code1 = self.player1.next_code
+        next_code2 = self.player2.next_code
+        record_codes1 = self.player1.record_codes
+        record_codes2 = self.player2.record_codes
+        tally = [0] * NUM_SYMBOLS
+        check_interval = self.stopping_rule.check_interval if self.stopping_rule is not None else 0
+
+        for round_number in range(self.rounds):
+            move1 = next_code1(round_number)
+            move2 = next_code2(round_number)
+            record_codes1(round_number, move1, move2)
+            record_codes2(round_number, move2, move1)
+            index = (move1 - move2) % NUM_SYMBOLS
+            tally[index] += 1
+            self.rounds_played = round_number + 1
+            yield RoundRecord(round_number, SYMBOLS[move1], SYMBOLS[move2], OUTCOMES[index])
+            if (check_interval and self.rounds_played % check_interval == 0 and
+                    self.stopping_rule.should_stop(wins=tally[1], losses=tally[2], ties=tally[0])):
+                break
+
+
+@cache
+def _has_numpy() -> bool:
+    return find_spec('numpy') is not None
+
+
+def _scores_from_tally(tally: list[int], mirror: bool = False) -> Counter[Outcome]:
+    """
+    Convert a tally of the rounds indexed by (move1 - move2) % 3 into the scores for player1, or
+    for player2 if mirror is set, where the outcomes are reversed.
+    """
+    scores: Counter[Outcome] = Counter()
+    for index, count in enumerate(tally):
+        if count:
+            outcome = OUTCOMES[index]
+            scores[Outcome(-outcome) if mirror else outcome] = count
+    return scores
@@ -0,0 +1,164 @@
+# Copyright (c) 2024 Sebastian Raaphorst.
+# For license information see LICENSE or https://opensource.org/licenses/BSD-3-Clause
+
+from collections import Counter
+from dataclasses import dataclass, field
+from os import PathLike
+from typing import final, Final, BinaryIO, Iterable, Optional, Union
+import json
+import mmap
+import struct
+
+from .match import Match
+from .streaming import chunked, default_chunk_size, RoundRecord
+from rps.players import AbstractPlayer
+from rps.rps import NUM_SYMBOLS, Outcome, OUTCOMES
+
+__all__ = [
+    'MatchLog',
+    'MatchLogWriter',
+    'record_match',
+]
+
+# The format of a match log is:
+# * a fixed header: the magic bytes, the format version, three bytes of padding, the number of rounds as
+#   an unsigned 64-bit int, and the length of the metadata as an unsigned 32-bit int, all little-endian;
+# * the metadata: a UTF-8 JSON object with the names of the players and the seed of the match; and
+# * one byte per round, holding move1 * 3 + move2 for the symbol codes of the moves.
+_MAGIC: Final[bytes] = b'RPSL'
+_VERSION: Final[int] = 1
+_HEADER: Final[struct.Struct] = struct.Struct('<4sBxxxQI')
+_ROUNDS_OFFSET: Final[int] = 8
+
+# Translation tables from a round byte to the code of each player's move.
+_MOVE1_TABLE: Final[bytes] = bytes(b // NUM_SYMBOLS for b in range(256))
+_MOVE2_TABLE: Final[bytes] = bytes(b % NUM_SYMBOLS for b in range(256))
+
+
+@final
+@dataclass
+class MatchLogWriter:
+    """
+    Writes a match log to a seekable binary file. The number of rounds in the header is filled in
+    when the writer is closed, so the number of rounds need not be known in advance.
+    """
+    file: BinaryIO
+    player1: str
+    player2: str
+    seed: Optional[int] = None
+    _rounds: int = field(init=False, default=0)
+
+    def __post_init__(self):
+        metadata = json.dumps({'player1': self.player1, 'player2': self.player2, 'seed': self.seed}).encode()
+        self.file.write(_HEADER.pack(_MAGIC, _VERSION, 0, len(metadata)))
+        self.file.write(metadata)
+
+    def write_codes(self, move1: int, move2: int) -> None:
+        """
+        Write a single round by the codes of the moves.
+        """
+        self.file.write(bytes((move1 * NUM_SYMBOLS + move2,)))
+        self._rounds += 1
+
+    def write(self, records: Iterable[RoundRecord], chunk_size: int = default_chunk_size) -> None:
+        """
+        Write a stream of records, one chunk at a time.
+        """
+        for chunk in chunked(records, chunk_size):
+            self.file.write(bytes(r.move1.code * NUM_SYMBOLS + r.move2.code for r in chunk))
+            self._rounds += len(chunk)
+
+    def close(self) -> None:
+        """
+        Fill in the number of rounds. This does not close the underlying file.
+        """
+        position = self.file.tell()
+        self.file.seek(_ROUNDS_OFFSET)
+        self.file.write(struct.pack('<Q', self._rounds))
+        self.file.seek(position)
+        self.file.flush()
+
+    def __enter__(self) -> 'MatchLogWriter':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def record_match(match: Match, path: Union[str, PathLike], chunk_size: int = default_chunk_size) -> None:
+    """
+    Play a match round by round, writing it to a match log at path.
+    The seed is recorded if the match was seeded with an int.
+    """
+    seed = match.rng if isinstance(match.rng, int) else None
+    with open(path, 'wb') as file, MatchLogWriter(file, match.player1.name, match.player2.name, seed) as writer:
+        writer.write(match.stream(), chunk_size)
+
+
+@final
+class MatchLog:
+    """
+    A read-only, memory-mapped match log. Rounds are decoded a chunk at a time, so logs much larger
+    than memory can be read and replayed.
+    """
+    def __init__(self, path: Union[str, PathLike]):
+        with open(path, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, rounds, metadata_length = _HEADER.unpack_from(self._mmap)
+        if magic != _MAGIC:
+            raise ValueError(f'Not a match log: {path}')
+        if version != _VERSION:
+            raise ValueError(f'Unsupported match log version {version}: {path}')
+        metadata = json.loads(self._mmap[_HEADER.size:_HEADER.size + metadata_length])
+        self.player1: str = metadata['player1']
+        self.player2: str = metadata['player2']
+        self.seed: Optional[int] = metadata['seed']
+        self.rounds: int = rounds
+        self._body = memoryview(self._mmap)[_HEADER.size + metadata_length:][:rounds]
+
+    def close(self) -> None:
+        self._body.release()
+        self._mmap.close()
+
+    def __enter__(self) -> 'MatchLog':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def codes(self, player: int, start: int = 0, stop: Optional[int] = None) -> bytes:
+        """
+        Return the codes of the moves of player 1 or 2 for the rounds in [start, stop).
+        """
+        if player not in (1, 2):
+            raise ValueError(f'Illegal player: {player}')
+        return bytes(self._body[start:stop]).translate(_MOVE1_TABLE if player == 1 else _MOVE2_TABLE)
+
+    def scores(self) -> Counter[Outcome]:
+        """
+        Return the recorded scores of player 1.
+        """
+        tally = [0] * NUM_SYMBOLS
+        for start in range(0, self.rounds, default_chunk_size):
+            moves1 = self.codes(1, start, start + default_chunk_size)
+            moves2 = self.codes(2, start, start + default_chunk_size)
+            for move1, move2 in zip(moves1, moves2):
+                tally[(move1 - move2) % NUM_SYMBOLS] += 1
+        return Counter({OUTCOMES[index]: count for index, count in enumerate(tally) if count})
+
+    def replay(self, player: AbstractPlayer, opponent: int = 2,
+               chunk_size: int = default_chunk_size) -> Counter[Outcome]:
+        """
+        Play a player against the recorded moves of player 1 or 2 of the log, without simulating that
+        player, and return the scores of the player. The player is reset first.
+        """
+        player.reset()
+        next_code = player.next_code
+        record_codes = player.record_codes
+        tally = [0] * NUM_SYMBOLS
+        for start in range(0, self.rounds, chunk_size):
+            for round_number, opponent_code in enumerate(self.codes(opponent, start, start + chunk_size), start):
+                move = next_code(round_number)
+                record_codes(round_number, move, opponent_code)
+                tally[(move - opponent_code) % NUM_SYMBOLS] += 1
+        return Counter({OUTCOMES[index]: count for index, count in enumerate(tally) if count})
@@ -0,0 +1,92 @@
+# Copyright (c) 2024 Sebastian Raaphorst.
+# For license information see LICENSE or https://opensource.org/licenses/BSD-3-Clause
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from math import log, sqrt
+from typing import final
+
+__all__ = [
+    'SequentialProbabilityRatioTest',
+    'StoppingRule',
+    'WilsonIntervalRule',
+]
+
+
+@dataclass(frozen=True)
+class StoppingRule(ABC):
+    """
+    A sequential test that decides when the result of a match is settled, so that the rest of its rounds
+    need not be played. The test is made every check_interval rounds on the wins, losses, and ties of
+    player1 so far. Ties carry no information about which player is stronger, so the tests here only
+    consider the decisive rounds.
+    """
+    check_interval: int = field(default=100, kw_only=True)
+
+    def __post_init__(self):
+        if self.check_interval < 1:
+            raise ValueError(f'Illegal check interval: {self.check_interval}')
+
+    @abstractmethod
+    def should_stop(self, wins: int, losses: int, ties: int) -> bool:
+        pass
+
+
+@final
+@dataclass(frozen=True)
+class SequentialProbabilityRatioTest(StoppingRule):
+    """
+    Wald's sequential probability ratio test of the hypotheses that player1 wins a decisive round with
+    probability 1/2 + delta or with probability 1/2 - delta, stopping when either is accepted with error
+    rates alpha and beta. This needs the fewest rounds on average for lopsided pairings, but it always
+    stops eventually, even for a pairing closer than delta.
+    """
+    delta: float = 0.1
+    alpha: float = 0.01
+    beta: float = 0.01
+
+    def __post_init__(self):
+        super().__post_init__()
+        if not 0 < self.delta < 0.5:
+            raise ValueError(f'Illegal delta: {self.delta}')
+        if not 0 < self.alpha < 1 or not 0 < self.beta < 1:
+            raise ValueError(f'Illegal error rates: {self.alpha}, {self.beta}')
+
+    def should_stop(self, wins: int, losses: int, ties: int) -> bool:
+        # Each net win adds the same amount to the log-likelihood ratio.
+        ratio = (wins - losses) * log((0.5 + self.delta) / (0.5 - self.delta))
+        return ratio >= log((1 - self.beta) / self.alpha) or ratio <= log(self.beta / (1 - self.alpha))
+
+
+@final
+@dataclass(frozen=True)
+class WilsonIntervalRule(StoppingRule):
+    """
+    Stop once the Wilson score interval at the given confidence for the rate at which player1 wins
+    decisive rounds lies wholly above or below 1/2 + margin or 1/2 - margin respectively. Unlike the
+    sequential probability ratio test, a pairing closer than the margin is played in full.
+
+    Note that checking repeatedly inflates the error rate above 1 - confidence, so the confidence should
+    be high, and a longer check interval reduces the inflation.
+    """
+    confidence: float = 0.999
+    margin: float = 0.0
+
+    def __post_init__(self):
+        super().__post_init__()
+        if not 0 < self.confidence < 1:
+            raise ValueError(f'Illegal confidence: {self.confidence}')
+        if not 0 <= self.margin < 0.5:
+            raise ValueError(f'Illegal margin: {self.margin}')
+
+    def should_stop(self, wins: int, losses: int, ties: int) -> bool:
+        n = wins + losses
+        if not n:
+            return False
+        # statistics is slow to import, and only needed by this rule.
+        from statistics import NormalDist
+        z = NormalDist().inv_cdf(0.5 + self.confidence / 2)
+        p = wins / n
+        centre = (p + z * z / (2 * n)) / (1 + z * z / n)
+        half_width = z * sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+        return centre - half_width > 0.5 + self.margin or centre + half_width < 0.5 - self.margin
@@ -0,0 +1,78 @@
+# Copyright (c) 2024 Sebastian Raaphorst.
+# For license information see LICENSE or https://opensource.org/licenses/BSD-3-Clause
+
+from itertools import islice
+from typing import final, Final, Iterable, Iterator, NamedTuple, TextIO
+import csv
+
+from rps.rps import Outcome, RPS
+
+__all__ = [
+    'RoundRecord',
+    'chunked',
+    'score_curve',
+    'write_csv',
+]
+
+default_chunk_size: Final[int] = 10000
+
+
+@final
+class RoundRecord(NamedTuple):
+    """
+    A compact record of a round of a match: the round number, the moves of the two players, and the
+    outcome for the first player.
+    """
+    round_number: int
+    move1: RPS
+    move2: RPS
+    outcome: Outcome
+
+
+def chunked(records: Iterable[RoundRecord], chunk_size: int = default_chunk_size) -> Iterator[list[RoundRecord]]:
+    """
+    Group a stream of records into lists of at most chunk_size records, so that only one chunk is held
+    in memory at a time.
+    """
+    if chunk_size < 1:
+        raise ValueError(f'Illegal chunk size: {chunk_size}')
+    iterator = iter(records)
+    while chunk := list(islice(iterator, chunk_size)):
+        yield chunk
+
+
+def write_csv(records: Iterable[RoundRecord], file: TextIO, chunk_size: int = default_chunk_size) -> int:
+    """
+    Write a stream of records to a CSV file with a header row, one chunk at a time, with the moves as
+    their symbols and the outcome as its score. Return the number of records written.
+    """
+    writer = csv.writer(file)
+    writer.writerow(RoundRecord._fields)
+    written = 0
+    for chunk in chunked(records, chunk_size):
+        writer.writerows((r.round_number, r.move1.value, r.move2.value, r.outcome.value) for r in chunk)
+        written += len(chunk)
+    return written
+
+
+def score_curve(records: Iterable[RoundRecord], interval: int) -> Iterator[tuple[int, int, int, int]]:
+    """
+    Summarize a stream of records as a learning curve: after every interval rounds, and after the last
+    round, yield the number of rounds played and the cumulative wins, losses, and ties of the first player.
+    """
+    if interval < 1:
+        raise ValueError(f'Illegal interval: {interval}')
+    wins = losses = ties = 0
+    rounds = 0
+    for record in records:
+        rounds += 1
+        if record.outcome == Outcome.WIN:
+            wins += 1
+        elif record.outcome == Outcome.LOSE:
+            losses += 1
+        else:
+            ties += 1
+        if rounds % interval == 0:
+            yield rounds, wins, losses, ties
+    if rounds % interval:
+        yield rounds, wins, losses, ties
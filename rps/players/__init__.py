@@ -1,10 +1,58 @@
 # Copyright (c) 2024 Sebastian Raaphorst.
 # For license information see LICENSE or https://opensource.org/licenses/BSD-3-Clause
 
-from .abstract_player import *
-from .double_markov_chain_player import *
-from .ensemble_player import *
-from .markov_chain_player import *
-from .pattern_player import *
-from .previous_symbol_function_player import *
-from .probability_player import *
+from typing import TYPE_CHECKING
+
+from rps._lazy import lazy_attributes
+
+# The submodule defining each public name. Submodules are only imported when one of their names is
+# first used, so that e.g. a single match only pays for importing the strategies it uses.
+_registry: dict[str, str] = {
+    'AbstractPlayer': 'abstract_player',
+    'BatchPlayer': 'batch_player',
+    'CountTable': 'count_table',
+    'DictCountTable': 'count_table',
+    'ArrayCountTable': 'count_table',
+    'BoundedCountTable': 'count_table',
+    'DoubleMarkovChainPlayer': 'double_markov_chain_player',
+    'EnsemblePlayer': 'ensemble_player',
+    'HedgeEnsemblePlayer': 'ensemble_player',
+    'LanePlayer': 'lanes',
+    'BaseMarkovChainLanes': 'lanes',
+    'MarkovChainLanes': 'lanes',
+    'DoubleMarkovChainLanes': 'lanes',
+    'PreviousSymbolLanes': 'lanes',
+    'BeatPreviousMoveLanes': 'lanes',
+    'BeatenByPreviousMoveLanes': 'lanes',
+    'PlayerLanes': 'lanes',
+    'MarkovChainPlayer': 'markov_chain_player',
+    'MarkovStrategyBank': 'markov_strategy_bank',
+    'BankedMarkovChainPlayer': 'markov_strategy_bank',
+    'FunctionPlayer': 'pattern_player',
+    'PatternPlayer': 'pattern_player',
+    'PriorTable': 'prior_table',
+    'PriorTrainer': 'prior_table',
+    'PreviousSymbolFunctionPlayer': 'previous_symbol_function_player',
+    'BeatPreviousMovePlayer': 'previous_symbol_function_player',
+    'BeatenByPreviousMovePlayer': 'previous_symbol_function_player',
+    'ProbabilityPlayer': 'probability_player',
+    'RandomPlayer': 'probability_player',
+    'ConstantPlayer': 'probability_player',
+}
+
+__all__ = list(_registry)
+__getattr__, __dir__ = lazy_attributes(__name__, _registry)
+
+if TYPE_CHECKING:
+    from .abstract_player import AbstractPlayer
+    from .batch_player import *
+    from .count_table import *
+    from .double_markov_chain_player import *
+    from .ensemble_player import *
+    from .lanes import *
+    from .markov_chain_player import *
+    from .markov_strategy_bank import *
+    from .pattern_player import *
+    from .previous_symbol_function_player import *
+    from .prior_table import *
+    from .probability_player import *
@@ -2,17 +2,52 @@
 # For license information see LICENSE or https://opensource.org/licenses/BSD-3-Clause
 
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Any, Optional, TypeVar, TYPE_CHECKING
+import copy
+import pickle
+import random
+import zlib
 
-from rps.rps import RPS
+from rps.common import make_rng, RandomSource
+from rps.rps import RPS, SYMBOLS
 
+if TYPE_CHECKING:
+    from rps.analysis import StateMachine
 
-@dataclass
+_P = TypeVar('_P', bound='AbstractPlayer')
+
+
+@dataclass(slots=True)
 class AbstractPlayer(ABC):
     """
     Generic interface to be implemented by an RPS player.
+
+    All randomness used by a player must come from its rng. If no rng is given, the player gets its own
+    independently seeded stream. Any other RandomSource, such as a seed, is converted to a random.Random
+    by __post_init__, so callers holding a RandomSource may pass it, but the attribute is always a random.Random.
+
+    Match drives players through the integer-coded next_code and record_codes, which by default are
+    views over next_move and record_round. Players with hot loops override the integer-coded methods
+    instead, and make next_move and record_round views over them.
+
+    Players with internal data extend get_state and set_state, so that a player can be snapshotted
+    mid-match or after training, and restored to continue exactly where it left off.
+
+    Deterministic players with finitely many states override state_machine, so that their matches can
+    be solved exactly by rps.analysis instead of being played.
     """
     name: str
+    rng: random.Random = field(default_factory=random.Random, kw_only=True, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.rng = make_rng(self.rng)
+
+    def set_rng(self, rng: RandomSource) -> None:
+        """
+        Replace the source of randomness used by the player.
+        """
+        self.rng = make_rng(rng)
 
     def reset(self) -> None:
         """
@@ -20,6 +55,74 @@ class AbstractPlayer(ABC):
         """
         pass
 
+    def clone(self: _P, rng: RandomSource = None) -> _P:
+        """
+        Return an independent, freshly reset copy of the player. This is a shallow copy that shares the
+        immutable parameters of the player, so it is much cheaper than a deep copy.
+
+        If rng is given, the copy uses it as if by set_rng. Otherwise, it gets a copy of the player's rng,
+        so that it plays exactly as the player would after a reset. Copying the state of an rng costs more
+        than seeding a new one, so callers that reseed the copy anyway should pass the new rng here.
+        """
+        clone = copy.copy(self)
+        clone.rng = copy.copy(self.rng) if rng is None else make_rng(rng)
+        clone._copy_internals()
+        clone.reset()
+        return clone
+
+    def _copy_internals(self) -> None:
+        """
+        Give a shallow copy of the player its own mutable internal data that reset does not replace.
+        Together with reset assigning fresh containers rather than clearing the existing ones in place,
+        this is what makes clone independent of the original.
+        """
+        pass
+
+    def get_state(self) -> dict[str, Any]:
+        """
+        Return the internal data of the player and the state of its rng, as plain data that shares
+        nothing mutable with the player.
+        """
+        return {'rng': self.rng.getstate()}
+
+    def set_state(self, state: dict[str, Any]) -> None:
+        """
+        Restore the internal data of the player and the state of its rng from get_state.
+        The player must have been created with the same parameters as the one the state came from.
+        """
+        self.rng.setstate(state['rng'])
+
+    def estimated_cost(self) -> float:
+        """
+        Return the cost of a round for the player relative to that of a simple player, which is 1. This is
+        only used to schedule the most expensive matches of a tournament first, so it need only be rough.
+        """
+        return 1.0
+
+    def state_machine(self) -> Optional['StateMachine']:
+        """
+        Return the player as a state machine starting from a reset, or None if it is not a finite state machine.
+        """
+        return None
+
+    def snapshot(self) -> bytes:
+        """
+        Return the state of the player as compressed bytes, which can be stored and restored later.
+        """
+        state = {'type': type(self).__qualname__, 'state': self.get_state()}
+        return zlib.compress(pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def restore(self, snapshot: bytes) -> None:
+        """
+        Restore the state of the player from snapshot. As the snapshot is pickled, it must come
+        from a trusted source.
+        """
+        state = pickle.loads(zlib.decompress(snapshot))
+        if state['type'] != type(self).__qualname__:
+            raise ValueError(f'Cannot restore player {self.name} of type {type(self).__qualname__} '
+                             f'from a snapshot of a {state["type"]}')
+        self.set_state(state['state'])
+
     @abstractmethod
     def next_move(self, round_number: int) -> RPS:
         """
@@ -33,3 +136,15 @@ class AbstractPlayer(ABC):
         Provides the move made by this player and the other player.
         """
         pass
+
+    def next_code(self, round_number: int) -> int:
+        """
+        Prompt the player for the code of its next move.
+        """
+        return self.next_move(round_number).code
+
+    def record_codes(self, round_number: int, player_code: int, opponent_code: int) -> None:
+        """
+        Record the details of a round by the codes of the symbols played.
+        """
+        self.record_round(round_number, SYMBOLS[player_code], SYMBOLS[opponent_code])
@@ -2,54 +2,138 @@
 # For license information see LICENSE or https://opensource.org/licenses/BSD-3-Clause
 
 from abc import abstractmethod
-from collections import Counter
 from dataclasses import dataclass, field
-import random
+from typing import Any, ClassVar, Optional
+import copy
 
 from .abstract_player import AbstractPlayer
-from rps.rps import rps_beater, rps_random, RPS
+from .count_table import ArrayCountTable, BoundedCountTable, CountTable, DictCountTable, EVICTION_POLICIES
+from .prior_table import PriorTable
+from rps.rps import BEATER, code_random, RPS, SYMBOLS
 
 __all__ = ['BaseMarkovChainPlayer']
 
 
-@dataclass
+@dataclass(slots=True)
 class BaseMarkovChainPlayer(AbstractPlayer):
+    """
+    The history of the last chain_length rounds is kept as a rolling integer context in base _radix,
+    with one digit per round and the most recent round as the lowest digit. The digit for a round
+    is determined by the subclass.
+
+    If array_backed is set, the counts are kept in a flat array of _radix^chain_length x 3 counts
+    instead of a dict of the contexts seen. This is faster, but see ArrayCountTable for its memory use.
+
+    If any of max_contexts, decay, or window is set, the counts are bounded in memory and forget the
+    past as described by BoundedCountTable, which is useful for long matches and high chain lengths.
+    The eviction policy only applies to max_contexts, so it may only be set with it, and is 'lru' if not set.
+
+    If prior is set, the counts are warm-started from those of the prior table for the chain length
+    whenever the player is reset, instead of starting empty.
+    """
     chain_length: int = 1
+    array_backed: bool = False
+    max_contexts: Optional[int] = None
+    eviction: Optional[str] = None
+    decay: Optional[float] = None
+    window: Optional[int] = None
+    prior: Optional[PriorTable] = field(default=None, repr=False, compare=False)
+
+    # The number of digits a round can contribute to the context.
+    _radix: ClassVar[int]
+
+    # _count_matrix keeps track of the counts of what was played by the opponent after each context
+    # to determine the probability of what to play next, i.e. it is a surrogate for the transition matrix.
+    _count_matrix: CountTable = field(init=False, repr=False)
 
-    # _count_matrix keeps track of the counts of what was played by the opponent to determine
-    # the probability of what to play next, i.e. it is a surrogate for the transition matrix.
-    _count_matrix: dict[tuple[RPS, ...], Counter[RPS]] = field(init=False, default_factory=dict)
+    # The context, and the number of rounds of history in it, up to chain_length.
+    _context: int = field(init=False, default=0)
+    _history_length: int = field(init=False, default=0)
 
-    # The states played by the other player.
-    _other_tuple: tuple[RPS, ...] = field(init=False, default_factory=tuple)
+    def __post_init__(self):
+        super(BaseMarkovChainPlayer, self).__post_init__()
+        if self.chain_length < 1:
+            raise ValueError(f'Illegal chain length for player {self.name}: {self.chain_length}')
+        num_contexts = self._radix ** self.chain_length
+        if self.prior is not None:
+            if self.prior.radix != self._radix:
+                raise ValueError(f'Prior table for player {self.name} has radix {self.prior.radix} '
+                                 f'instead of {self._radix}')
+            if self.prior.max_order < self.chain_length:
+                raise ValueError(f'Prior table for player {self.name} has no chains of length {self.chain_length}')
+        if self.eviction is not None:
+            if self.eviction not in EVICTION_POLICIES:
+                raise ValueError(f'Illegal eviction policy for player {self.name}: {self.eviction}')
+            if self.max_contexts is None:
+                raise ValueError(f'Player {self.name} has an eviction policy but no maximum number of contexts.')
+        if self.max_contexts is not None or self.decay is not None or self.window is not None:
+            if self.array_backed:
+                raise ValueError(f'Player {self.name} cannot be both array backed and bounded.')
+            eviction = self.eviction if self.eviction is not None else 'lru'
+            self._count_matrix = BoundedCountTable(num_contexts, max_contexts=self.max_contexts,
+                                                   eviction=eviction, decay=self.decay, window=self.window)
+        elif self.array_backed:
+            self._count_matrix = ArrayCountTable(num_contexts)
+        else:
+            self._count_matrix = DictCountTable(num_contexts)
+        if self.prior is not None:
+            self._count_matrix.load(self.prior, self.chain_length)
 
     @abstractmethod
-    def _get_transition_key(self) -> tuple[RPS, ...]:
+    def _round_digit(self, player_code: int, opponent_code: int) -> int:
         """
-        Abstract method to create the key representing the state.
+        Abstract method to determine the digit in [0, _radix) that a round contributes to the context.
         """
         pass
 
     def reset(self) -> None:
-        self._count_matrix.clear()
-        self._other_tuple = ()
+        if self.prior is None:
+            self._count_matrix.clear()
+        else:
+            self._count_matrix.load(self.prior, self.chain_length)
+        self._context = 0
+        self._history_length = 0
+
+    def _copy_internals(self) -> None:
+        # The table clears itself by assigning fresh containers, so a shallow copy of it suffices.
+        self._count_matrix = copy.copy(self._count_matrix)
+
+    def estimated_cost(self) -> float:
+        # Drawing from and updating the counts costs about as much again as a simple player.
+        return 2.0
+
+    def get_state(self) -> dict[str, Any]:
+        return {**super(BaseMarkovChainPlayer, self).get_state(),
+                'counts': self._count_matrix.get_state(),
+                'context': self._context,
+                'history_length': self._history_length}
+
+    def set_state(self, state: dict[str, Any]) -> None:
+        super(BaseMarkovChainPlayer, self).set_state(state)
+        self._count_matrix.set_state(state['counts'])
+        self._context = state['context']
+        self._history_length = state['history_length']
 
     def next_move(self, round_number: int) -> RPS:
-        if len(self._other_tuple) < self.chain_length:
-            return rps_random()
+        return SYMBOLS[self.next_code(round_number)]
 
-        key = self._get_transition_key()
-        counts = self._count_matrix.get(key)
-        if counts is None:
-            return rps_random()
+    def next_code(self, round_number: int) -> int:
+        if self._history_length < self.chain_length:
+            return code_random(self.rng)
 
-        total_plays = sum(counts.values())
-        n = random.randrange(total_plays)
+        # Predict the opponent's next symbol from the counts, and play what beats it.
+        prediction = self._count_matrix.draw(self._context, self.rng)
+        if prediction is None:
+            return code_random(self.rng)
+        return BEATER[prediction]
 
-        cumulative = 0
-        for rps, count in counts.items():
-            cumulative += count
-            if n < cumulative:
-                return rps_beater(rps)
+    def record_round(self, round_number: int, player_symbol: RPS, opponent_symbol: RPS) -> None:
+        self.record_codes(round_number, player_symbol.code, opponent_symbol.code)
 
-        raise ValueError(f'Could not determine next move for player {self.name}.')
+    def record_codes(self, round_number: int, player_code: int, opponent_code: int) -> None:
+        if self._history_length == self.chain_length:
+            self._count_matrix.increment(self._context, opponent_code)
+        else:
+            self._history_length += 1
+        self._context = ((self._context * self._radix + self._round_digit(player_code, opponent_code))
+                         % self._count_matrix.num_contexts)
@@ -0,0 +1,32 @@
+# Copyright (c) 2024 Sebastian Raaphorst.
+# For license information see LICENSE or https://opensource.org/licenses/BSD-3-Clause
+
+from abc import abstractmethod
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from .abstract_player import AbstractPlayer
+
+if TYPE_CHECKING:
+    import numpy as np
+
+__all__ = ['BatchPlayer']
+
+
+@dataclass(slots=True)
+class BatchPlayer(AbstractPlayer):
+    """
+    A player whose moves do not depend on the opponent, and can thus all be produced at once.
+    When both players in a match are batch players, the match is scored with array operations, and
+    record_round is never called.
+
+    NumPy is required for the batch protocol, and is only imported when it is used.
+    """
+    @abstractmethod
+    def next_codes(self, round_number: int, count: int) -> 'np.ndarray':
+        """
+        Return an array of the codes of the moves for the count rounds starting at round_number.
+        These must be the moves, and draw the randomness, that count calls to next_code would,
+        so that a vectorized match plays exactly as one played round by round.
+        """
+        pass
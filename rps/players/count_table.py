@@ -0,0 +1,338 @@
+# Copyright (c) 2024 Sebastian Raaphorst.
+# For license information see LICENSE or https://opensource.org/licenses/BSD-3-Clause
+
+from abc import ABC, abstractmethod
+from array import array
+from collections import deque, OrderedDict
+from dataclasses import dataclass, field
+from typing import final, Any, Final, Optional, TYPE_CHECKING
+import copy
+import heapq
+import random
+
+from rps.rps import NUM_SYMBOLS
+
+if TYPE_CHECKING:
+    from .prior_table import PriorTable
+
+__all__ = [
+    'CountTable',
+    'DictCountTable',
+    'ArrayCountTable',
+    'BoundedCountTable',
+]
+
+# Each context has a count per symbol code, followed by the running total of the counts.
+COUNTS_STRIDE: Final[int] = NUM_SYMBOLS + 1
+
+# The eviction policies of a BoundedCountTable.
+EVICTION_POLICIES: Final[tuple[str, ...]] = ('lru', 'lfu')
+
+# With exponential decay, new counts are weighted ever more heavily instead of old counts being scaled
+# down every round. When the weight passes this, everything is rescaled back down to avoid overflow.
+_MAX_WEIGHT: Final[float] = 1e100
+
+
+def draw_from_counts(rock: float, paper: float, total: float, rng: random.Random) -> int:
+    """
+    Draw a symbol code with probability proportional to its count, given the counts of rock and paper
+    and the running total, so that the counts need not be summed per draw.
+    """
+    u = rng.random() * total
+    return 0 if u < rock else 1 if u < rock + paper else 2
+
+
+@dataclass(slots=True)
+class CountTable(ABC):
+    """
+    The counts of the symbol codes played after each context, where the contexts are the integers
+    in [0, num_contexts). This is the surrogate for the transition matrix of a Markov chain.
+    """
+    num_contexts: int
+
+    @abstractmethod
+    def clear(self) -> None:
+        """
+        Remove all counts.
+        """
+        pass
+
+    @abstractmethod
+    def increment(self, context: int, code: int) -> None:
+        """
+        Record that the symbol code was played after the context.
+        """
+        pass
+
+    @abstractmethod
+    def counts(self, context: int) -> Optional[tuple[int, ...]]:
+        """
+        Return the counts for the context in symbol code order, or None if the context has never been seen.
+        """
+        pass
+
+    @abstractmethod
+    def draw(self, context: int, rng: random.Random) -> Optional[int]:
+        """
+        Draw a symbol code with probability proportional to its count after the context, or return None
+        if the context has never been seen.
+        All implementations must draw identically, using draw_from_counts.
+        """
+        pass
+
+    @abstractmethod
+    def load(self, prior: 'PriorTable', order: int) -> None:
+        """
+        Replace the counts with those of the given order of a prior table, whose number of contexts must match.
+        """
+        pass
+
+    @abstractmethod
+    def get_state(self) -> Any:
+        """
+        Return the counts as plain data that shares nothing mutable with the table.
+        """
+        pass
+
+    @abstractmethod
+    def set_state(self, state: Any) -> None:
+        """
+        Restore the counts from get_state of a table of the same type and number of contexts.
+        """
+        pass
+
+
+@final
+@dataclass(slots=True)
+class DictCountTable(CountTable):
+    """
+    A count table that only stores the contexts that have been seen, each as a list of the counts
+    followed by their running total.
+    """
+    _counts: dict[int, list[int]] = field(init=False, default_factory=dict)
+
+    def clear(self) -> None:
+        self._counts = {}
+
+    def load(self, prior: 'PriorTable', order: int) -> None:
+        self._counts = {context: list(counts) for context, counts in prior.seen(order).items()}
+
+    def get_state(self) -> dict[int, list[int]]:
+        return {context: list(counts) for context, counts in self._counts.items()}
+
+    def set_state(self, state: dict[int, list[int]]) -> None:
+        self._counts = {context: list(counts) for context, counts in state.items()}
+
+    def increment(self, context: int, code: int) -> None:
+        counts = self._counts.get(context)
+        if counts is None:
+            counts = self._counts[context] = [0] * COUNTS_STRIDE
+        counts[code] += 1
+        counts[NUM_SYMBOLS] += 1
+
+    def counts(self, context: int) -> Optional[tuple[int, ...]]:
+        counts = self._counts.get(context)
+        return None if counts is None else tuple(counts[:NUM_SYMBOLS])
+
+    def draw(self, context: int, rng: random.Random) -> Optional[int]:
+        counts = self._counts.get(context)
+        if counts is None:
+            return None
+        return draw_from_counts(counts[0], counts[1], counts[NUM_SYMBOLS], rng)
+
+
+@final
+@dataclass(slots=True)
+class ArrayCountTable(CountTable):
+    """
+    A count table stored in a flat array of num_contexts x 4 unsigned 32-bit ints, where the count
+    of code after context is at index 4 * context + code, and their running total at 4 * context + 3.
+
+    This avoids the overhead of a dict and its lists, but the array is allocated in full, so it is
+    only suitable when num_contexts is moderate: 3^8 contexts take 103 KiB, but 9^8 take 657 MiB.
+    """
+    _counts: array = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.clear()
+
+    def clear(self) -> None:
+        self._counts = array('I', bytes(4 * COUNTS_STRIDE * self.num_contexts))
+
+    def load(self, prior: 'PriorTable', order: int) -> None:
+        self.set_state(prior.raw_counts(order))
+
+    def get_state(self) -> bytes:
+        return self._counts.tobytes()
+
+    def set_state(self, state: bytes) -> None:
+        counts = array('I')
+        counts.frombytes(state)
+        if len(counts) != COUNTS_STRIDE * self.num_contexts:
+            raise ValueError(f'State has {len(counts) // COUNTS_STRIDE} contexts instead of {self.num_contexts}')
+        self._counts = counts
+
+    def increment(self, context: int, code: int) -> None:
+        index = COUNTS_STRIDE * context
+        self._counts[index + code] += 1
+        self._counts[index + NUM_SYMBOLS] += 1
+
+    def counts(self, context: int) -> Optional[tuple[int, ...]]:
+        index = COUNTS_STRIDE * context
+        counts = tuple(self._counts[index:index + NUM_SYMBOLS])
+        return counts if any(counts) else None
+
+    def draw(self, context: int, rng: random.Random) -> Optional[int]:
+        index = COUNTS_STRIDE * context
+        counts = self._counts
+        total = counts[index + NUM_SYMBOLS]
+        if not total:
+            return None
+        return draw_from_counts(counts[index], counts[index + 1], total, rng)
+
+
+@final
+@dataclass(slots=True)
+class BoundedCountTable(CountTable):
+    """
+    A count table with bounded memory and counts that forget the past, for long-running players and
+    opponents that change strategy mid-match. Any combination of the following may be given:
+    * max_contexts: the number of contexts kept, beyond which the least recently used context ('lru')
+      or the least frequently used context ('lfu') is evicted, as per eviction.
+    * decay: the factor in (0, 1] by which all counts are multiplied after each increment, so that the
+      weight of a round decays exponentially with its age. This is applied lazily by weighting each new
+      count by the inverse of the accumulated decay instead, so it costs nothing per round.
+    * window: the number of most recent increments counted, older ones being forgotten.
+    Exponential decay and a window cannot be combined. Under decay, the frequencies used for 'lfu' are
+    the decayed counts.
+    """
+    max_contexts: Optional[int] = None
+    eviction: str = 'lru'
+    decay: Optional[float] = None
+    window: Optional[int] = None
+
+    # The counts per context followed by their running total, in order of use for 'lru'.
+    _counts: OrderedDict[int, list[float]] = field(init=False, repr=False, default_factory=OrderedDict)
+
+    # For 'lfu', a heap of (total, context) pairs, including stale pairs for totals since changed.
+    _frequencies: list[tuple[float, int]] = field(init=False, repr=False, default_factory=list)
+
+    # For decay, the weight of the next increment.
+    _weight: float = field(init=False, repr=False, default=1.0)
+
+    # For a window, the increments in it as the context, its counts at the time, and the code.
+    _increments: deque[tuple[int, list[float], int]] = field(init=False, repr=False, default_factory=deque)
+
+    def __post_init__(self):
+        if self.max_contexts is not None and self.max_contexts < 1:
+            raise ValueError(f'Illegal maximum number of contexts: {self.max_contexts}')
+        if self.eviction not in EVICTION_POLICIES:
+            raise ValueError(f'Illegal eviction policy: {self.eviction}')
+        if self.decay is not None and not 0 < self.decay <= 1:
+            raise ValueError(f'Illegal decay: {self.decay}')
+        if self.window is not None and self.window < 1:
+            raise ValueError(f'Illegal window: {self.window}')
+        if self.decay is not None and self.window is not None:
+            raise ValueError('Decay and window cannot be combined.')
+
+    def clear(self) -> None:
+        self._counts = OrderedDict()
+        self._frequencies = []
+        self._weight = 1.0
+        self._increments = deque()
+
+    def load(self, prior: 'PriorTable', order: int) -> None:
+        """
+        The prior counts are never forgotten by a window, but decay like any others. If there are more
+        contexts than max_contexts, those with the largest totals are kept.
+        """
+        self.clear()
+        seen = prior.seen(order)
+        contexts = list(seen)
+        if self.max_contexts is not None and len(contexts) > self.max_contexts:
+            contexts = sorted(contexts, key=lambda context: seen[context][NUM_SYMBOLS])[-self.max_contexts:]
+        for context in contexts:
+            counts = self._counts[context] = list(seen[context])
+            self._update_frequency(context, counts)
+
+    def get_state(self) -> tuple:
+        # The increments in the window share their counts with the table, which a deep copy preserves.
+        return copy.deepcopy((self._counts, self._frequencies, self._weight, self._increments))
+
+    def set_state(self, state: tuple) -> None:
+        self._counts, self._frequencies, self._weight, self._increments = copy.deepcopy(state)
+
+    def increment(self, context: int, code: int) -> None:
+        counts = self._counts.get(context)
+        if counts is None:
+            if self.max_contexts is not None and len(self._counts) >= self.max_contexts:
+                self._evict()
+            counts = self._counts[context] = [0] * COUNTS_STRIDE
+        elif self.eviction == 'lru':
+            self._counts.move_to_end(context)
+
+        weight = self._weight
+        counts[code] += weight
+        counts[NUM_SYMBOLS] += weight
+        self._update_frequency(context, counts)
+
+        if self.decay is not None and self.decay < 1:
+            self._weight = weight / self.decay
+            if self._weight > _MAX_WEIGHT:
+                self._rescale()
+
+        if self.window is not None:
+            self._increments.append((context, counts, code))
+            if len(self._increments) > self.window:
+                self._forget()
+
+    def _update_frequency(self, context: int, counts: list[float]) -> None:
+        if self.eviction != 'lfu' or self.max_contexts is None:
+            return
+        heapq.heappush(self._frequencies, (counts[NUM_SYMBOLS], context))
+        # Drop the stale pairs once they dominate the heap.
+        if len(self._frequencies) > 2 * len(self._counts) + 16:
+            self._frequencies = [(counts[NUM_SYMBOLS], context) for context, counts in self._counts.items()]
+            heapq.heapify(self._frequencies)
+
+    def _evict(self) -> None:
+        if self.eviction == 'lru':
+            self._counts.popitem(last=False)
+            return
+        while True:
+            total, context = heapq.heappop(self._frequencies)
+            counts = self._counts.get(context)
+            if counts is not None and counts[NUM_SYMBOLS] == total:
+                del self._counts[context]
+                return
+
+    def _rescale(self) -> None:
+        scale = self._weight
+        for counts in self._counts.values():
+            for index in range(COUNTS_STRIDE):
+                counts[index] /= scale
+        self._frequencies = [(total / scale, context) for total, context in self._frequencies]
+        self._weight = 1.0
+
+    def _forget(self) -> None:
+        context, counts, code = self._increments.popleft()
+        counts[code] -= 1
+        counts[NUM_SYMBOLS] -= 1
+        # The counts may be those of a context evicted since, which are simply dropped.
+        if self._counts.get(context) is counts:
+            if counts[NUM_SYMBOLS]:
+                self._update_frequency(context, counts)
+            else:
+                del self._counts[context]
+
+    def counts(self, context: int) -> Optional[tuple[float, ...]]:
+        counts = self._counts.get(context)
+        if counts is None:
+            return None
+        return tuple(count / self._weight for count in counts[:NUM_SYMBOLS])
+
+    def draw(self, context: int, rng: random.Random) -> Optional[int]:
+        counts = self._counts.get(context)
+        if counts is None:
+            return None
+        return draw_from_counts(counts[0], counts[1], counts[NUM_SYMBOLS], rng)
@@ -1,39 +1,23 @@
 # Copyright (c) 2024 Sebastian Raaphorst.
 # For license information see LICENSE or https://opensource.org/licenses/BSD-3-Clause
 
-from collections import Counter
-from dataclasses import dataclass, field
-from typing import final
+from dataclasses import dataclass
+from typing import final, ClassVar
 
 from .base_markov_chain_player import BaseMarkovChainPlayer
-from rps.rps import RPS
+from rps.rps import NUM_SYMBOLS
 
 __all__ = ['DoubleMarkovChainPlayer']
 
 
 @final
-@dataclass
+@dataclass(slots=True)
 class DoubleMarkovChainPlayer(BaseMarkovChainPlayer):
-    _my_tuple: tuple[RPS, ...] = field(init=False, default_factory=tuple)
-
-    def _get_transition_key(self) -> tuple[RPS, ...]:
-        return self._my_tuple + self._other_tuple
-
-    def reset(self) -> None:
-        super().reset()
-        self._my_tuple = ()
-
-    def record_round(self, round_number: int, player_symbol: RPS, opponent_symbol: RPS) -> None:
-        if len(self._my_tuple) != len(self._other_tuple):
-            raise RuntimeError(f'{self.name} has uneven keys: {self._my_tuple}, {self._other_tuple}')
-
-        if len(self._other_tuple) == self.chain_length:
-            key = self._get_transition_key()
-            ctr = self._count_matrix.setdefault(key, Counter())
-            ctr[opponent_symbol] += 1
-
-            self._my_tuple = self._my_tuple[1:] + (player_symbol,)
-            self._other_tuple = self._other_tuple[1:] + (opponent_symbol,)
-        else:
-            self._my_tuple += (player_symbol,)
-            self._other_tuple += (opponent_symbol,)
+    """
+    Markov chain player using the specified chain length, where both players' last moves
+    form the key.
+    """
+    _radix: ClassVar[int] = NUM_SYMBOLS * NUM_SYMBOLS
+
+    def _round_digit(self, player_code: int, opponent_code: int) -> int:
+        return player_code * NUM_SYMBOLS + opponent_code
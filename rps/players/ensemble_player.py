@@ -1,19 +1,30 @@
 # Copyright (c) 2024 Sebastian Raaphorst.
 # For license information see LICENSE or https://opensource.org/licenses/BSD-3-Clause
 
-from collections import Counter
 from dataclasses import dataclass, field, InitVar
-from typing import final, Optional
+from math import exp
+from typing import final, Any, Final, Iterable, Optional
+import copy
+import random
 
 from .abstract_player import AbstractPlayer
-from rps.common import probability_selector
-from rps.rps import rps_compare, Outcome, RPS
+from .count_table import draw_from_counts
+from .markov_strategy_bank import BankedMarkovChainPlayer, MarkovStrategyBank
+from rps.common import make_rng, probability_selector, RandomSource, split_rng
+from rps.rps import code_random, NUM_SYMBOLS, RPS, SYMBOLS
 
-__all__ = ['EnsemblePlayer']
+__all__ = [
+    'EnsemblePlayer',
+    'HedgeEnsemblePlayer',
+]
+
+# When the largest weight of a HedgeEnsemblePlayer passes this or falls below its inverse, the weights are
+# rescaled to avoid overflow or underflow.
+_MAX_WEIGHT: Final[float] = 1e100
 
 
 @final
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class StrategyConfidence:
     # P(A_i) as described below.
     str_prob: float
@@ -23,54 +34,93 @@ class StrategyConfidence:
 
 
 @final
-@dataclass
+@dataclass(slots=True)
 class EnsembleRecord:
+    """
+    Running totals of the guesses made by a strategy, from which its confidence is kept up to date
+    in record_codes, so that consulting it costs a single multiplication.
+    """
     strategy: AbstractPlayer
-    guesses: dict[Outcome, Counter[RPS]] = field(init=False, default_factory=dict)
+
+    # The number of guesses by the strategy that won and lost.
+    wins: int = field(init=False, default=0)
+    losses: int = field(init=False, default=0)
+
+    # For each symbol code, the number of guesses of the code by the strategy, and how many of them won.
+    sym_guesses: list[int] = field(init=False, default_factory=lambda: [0] * NUM_SYMBOLS)
+    sym_wins: list[int] = field(init=False, default_factory=lambda: [0] * NUM_SYMBOLS)
+
+    # P(A) and, for each symbol code T, P(T|A) as described in EnsemblePlayer.
+    str_prob: float = field(init=False, default=0.5)
+    sym_cond_prob: list[float] = field(init=False, default_factory=lambda: [0.5] * NUM_SYMBOLS)
 
     def reset(self):
         """
-        Resets the entire EnsembleRecord, including the strategy, confidence_level, and next_guess.
+        Resets the entire EnsembleRecord, including the strategy and its running totals.
         """
         self.strategy.reset()
-        self.guesses = {outcome: Counter() for outcome in Outcome}
-
-    def next_guess(self, round_num: int) -> RPS:
-        return self.strategy.next_move(round_num)
-
-    def record_round(self, round_number: int, player_symbol: RPS, opponent_symbol: RPS) -> None:
+        self.wins = 0
+        self.losses = 0
+        self.sym_guesses = [0] * NUM_SYMBOLS
+        self.sym_wins = [0] * NUM_SYMBOLS
+        self.str_prob = 0.5
+        self.sym_cond_prob = [0.5] * NUM_SYMBOLS
+
+    def get_state(self) -> dict[str, Any]:
+        """
+        Return the running totals and the state of the strategy.
+        """
+        return {'strategy': self.strategy.get_state(),
+                'wins': self.wins,
+                'losses': self.losses,
+                'sym_guesses': list(self.sym_guesses),
+                'sym_wins': list(self.sym_wins),
+                'str_prob': self.str_prob,
+                'sym_cond_prob': list(self.sym_cond_prob)}
+
+    def set_state(self, state: dict[str, Any]) -> None:
+        self.strategy.set_state(state['strategy'])
+        self.wins = state['wins']
+        self.losses = state['losses']
+        self.sym_guesses = list(state['sym_guesses'])
+        self.sym_wins = list(state['sym_wins'])
+        self.str_prob = state['str_prob']
+        self.sym_cond_prob = list(state['sym_cond_prob'])
+
+    def next_guess(self, round_num: int) -> int:
+        return self.strategy.next_code(round_num)
+
+    def record_codes(self, round_number: int, player_code: int, opponent_code: int) -> None:
         """
         Records the impact of the current guess for this strategy and its impact on the
         confidence of the strategy.
         """
-        self.strategy.record_round(round_number, player_symbol, opponent_symbol)
-
-        outcome = rps_compare(player_symbol, opponent_symbol)
-        self.guesses[outcome][player_symbol] += 1
+        self.strategy.record_codes(round_number, player_code, opponent_code)
+
+        # Only P(T|A) for the guess can change, and P(A) only changes if the round was not a tie.
+        difference = (player_code - opponent_code) % NUM_SYMBOLS
+        if difference == 1:
+            self.wins += 1
+            self.sym_wins[player_code] += 1
+        elif difference == 2:
+            self.losses += 1
+        if difference:
+            self.str_prob = self.wins / (self.wins + self.losses)
+        self.sym_guesses[player_code] += 1
+        self.sym_cond_prob[player_code] = self.sym_wins[player_code] / self.sym_guesses[player_code]
 
     def determine_confidence(self) -> StrategyConfidence:
         """
         For this strategy A, determine P(A) and P(T|A) as above for T in RPS.
+        If there have been no wins or losses, or no guesses of T, these default to 0.5 to indicate no
+        known information.
         """
-        # Calculate the confidence level P(A) for this strategy.
-        # If there have been no wins or losses, use a default of 0.5 to indicate no known information.
-        wins = sum(self.guesses[Outcome.WIN].values())
-        losses = sum(self.guesses[Outcome.LOSE].values())
-        str_prob = 0.5 if wins + losses == 0 else wins / (wins + losses)
-
-        # Calculate the probability for each symbol T given A, i.e. P(T|A).
-        sym_cond_prob: dict[RPS, float] = {}
-        for sym in RPS:
-            correct_sym_guesses = self.guesses[Outcome.WIN][sym]
-            total_sym_guesses = sum(self.guesses[outcome][sym] for outcome in Outcome)
-            sym_cond_prob[sym] = correct_sym_guesses / total_sym_guesses if total_sym_guesses else 0.5
-
-        return StrategyConfidence(str_prob=str_prob,
-                                  sym_cond_prob=sym_cond_prob)
+        return StrategyConfidence(str_prob=self.str_prob,
+                                  sym_cond_prob={sym: self.sym_cond_prob[sym.code] for sym in RPS})
 
 
 @final
-@dataclass
+@dataclass(slots=True)
 class EnsemblePlayer(AbstractPlayer):
     """
     Uses an ensemble of strategies to predict the next winning move.
@@ -102,45 +152,340 @@ class EnsemblePlayer(AbstractPlayer):
     strategies: InitVar[list[AbstractPlayer]]
     deterministic: bool = False
     _ensemble_records: list[EnsembleRecord] = field(init=False)
-    _current_guesses: list[Optional[RPS]] = field(init=False)
+    _current_guesses: list[Optional[int]] = field(init=False)
+
+    # Whether the strategies were consulted for the round being played, so that their guesses can be scored.
+    _consulted: bool = field(init=False, default=False)
 
     def __post_init__(self, strategies: list[AbstractPlayer]):
+        super(EnsemblePlayer, self).__post_init__()
         self._ensemble_records = [EnsembleRecord(strategy) for strategy in strategies]
         self._current_guesses = [None] * len(self._ensemble_records)
+        self.set_rng(self.rng)
+
+    def set_rng(self, rng: RandomSource) -> None:
+        """
+        Set the source of randomness for the ensemble, and give each strategy a stream split from it.
+        """
+        super(EnsemblePlayer, self).set_rng(rng)
+        for ensemble_record in self._ensemble_records:
+            ensemble_record.strategy.set_rng(split_rng(self.rng))
 
     def reset(self) -> None:
         for ensemble_record in self._ensemble_records:
             ensemble_record.reset()
+        self._consulted = False
+
+    def get_strategies(self) -> list[AbstractPlayer]:
+        """
+        Return the strategies of the ensemble, as it was given them.
+        """
+        return [ensemble_record.strategy for ensemble_record in self._ensemble_records]
+
+    def estimated_cost(self) -> float:
+        # Every strategy is consulted and updated every round.
+        return 1.0 + sum(ensemble_record.strategy.estimated_cost() for ensemble_record in self._ensemble_records)
+
+    def clone(self, rng: RandomSource = None) -> 'EnsemblePlayer':
+        """
+        Return a fresh copy of the ensemble with clones of its strategies, where strategies that share a
+        MarkovStrategyBank share a single clone of it. If rng is given, the strategies get streams split
+        from it, exactly as set_rng gives them.
+        """
+        clone = copy.copy(self)
+        clone.rng = copy.copy(self.rng) if rng is None else make_rng(rng)
+        strategies = _clone_strategies((ensemble_record.strategy for ensemble_record in self._ensemble_records),
+                                       None if rng is None else clone.rng)
+        clone._ensemble_records = [EnsembleRecord(strategy) for strategy in strategies]
+        clone._current_guesses = [None] * len(strategies)
+        clone._consulted = False
+        return clone
+
+    def get_state(self) -> dict[str, Any]:
+        return {**super(EnsemblePlayer, self).get_state(),
+                'records': [ensemble_record.get_state() for ensemble_record in self._ensemble_records],
+                'banks': [bank.get_state() for bank in _banks(self.get_strategies())],
+                'current_guesses': list(self._current_guesses),
+                'consulted': self._consulted}
+
+    def set_state(self, state: dict[str, Any]) -> None:
+        if len(state['records']) != len(self._ensemble_records):
+            raise ValueError(f'State has {len(state["records"])} strategies instead of {len(self._ensemble_records)}')
+        super(EnsemblePlayer, self).set_state(state)
+        for ensemble_record, record_state in zip(self._ensemble_records, state['records']):
+            ensemble_record.set_state(record_state)
+        _set_bank_states(self.get_strategies(), state['banks'])
+        self._current_guesses = list(state['current_guesses'])
+        self._consulted = state['consulted']
 
     def next_move(self, round_number: int) -> RPS:
-        # Get the next guesses for each strategy.
-        self._current_guesses = []
+        return SYMBOLS[self.next_code(round_number)]
 
-        # Combine the confidences for each strategy to come up with a probability for each move.
-        sym_confidence = {sym: 0 for sym in RPS}
-        for ensemble_record in self._ensemble_records:
-            guess = ensemble_record.next_guess(round_number)
-            self._current_guesses.append(guess)
-            str_confidence = ensemble_record.determine_confidence()
+    def next_code(self, round_number: int) -> int:
+        self._consulted = True
 
-            # Adjust the confidence for this strategy for the guess to give it a score.
-            sym_confidence[guess] += str_confidence.str_prob * str_confidence.sym_cond_prob[guess]
+        # Get the next guesses for each strategy, and combine the confidences for each strategy,
+        # which are kept up to date by the records, to come up with a probability for each move.
+        current_guesses = self._current_guesses
+        sym_confidence = [0.0] * NUM_SYMBOLS
+        for index, ensemble_record in enumerate(self._ensemble_records):
+            guess = ensemble_record.strategy.next_code(round_number)
+            current_guesses[index] = guess
+            sym_confidence[guess] += ensemble_record.str_prob * ensemble_record.sym_cond_prob[guess]
 
         # Normalize the levels.
-        sym_confidence_sum = sum(sym_confidence.values())
-        sym_probability: dict[RPS, float] = {}
-        for sym in RPS:
-            sym_probability[sym] = sym_confidence[sym] / sym_confidence_sum if sym_confidence_sum else 0.5
+        sym_confidence_sum = sum(sym_confidence)
+        sym_probability: dict[int, float] = {}
+        for code in range(NUM_SYMBOLS):
+            sym_probability[code] = sym_confidence[code] / sym_confidence_sum if sym_confidence_sum else 0.5
 
         if self.deterministic:
             return max(sym_probability, key=sym_probability.get)
         else:
-            return probability_selector(sym_probability)
+            move = probability_selector(sym_probability, self.rng)
+            return move if move is not None else code_random(self.rng)
 
     def record_round(self, round_number: int, player_symbol: RPS, opponent_symbol: RPS) -> None:
+        self.record_codes(round_number, player_symbol.code, opponent_symbol.code)
+
+    def record_codes(self, round_number: int, player_code: int, opponent_code: int) -> None:
         """
         For each strategy, record the round and update the confidence in that strategy
         and the guess which it made.
+
+        If the ensemble was not consulted for the round, e.g. as a dormant member of a HedgeEnsemblePlayer,
+        the strategies have no guesses to score, and only record the round with the ensemble's move as theirs.
         """
+        if not self._consulted:
+            for ensemble_record in self._ensemble_records:
+                ensemble_record.strategy.record_codes(round_number, player_code, opponent_code)
+            return
+        self._consulted = False
         for ensemble_record, guess in zip(self._ensemble_records, self._current_guesses):
-            ensemble_record.record_round(round_number, guess, opponent_symbol)
+            ensemble_record.record_codes(round_number, guess, opponent_code)
+
+
+@final
+@dataclass(slots=True)
+class HedgeEnsemblePlayer(AbstractPlayer):
+    """
+    An ensemble that weights its strategies by multiplicative weights, or Hedge: every strategy starts with
+    a weight of 1, and after each round the weight of a strategy that was consulted is multiplied by
+    exp(learning_rate) if its guess won, and by exp(-learning_rate) if it lost. The ensemble plays the
+    guess with the most weight behind it if deterministic, and otherwise picks a guess with probability
+    proportional to the weight behind it.
+
+    A strategy whose weight falls below threshold times the largest weight goes dormant: it is no longer
+    consulted, but it still records every round, with the ensemble's move as its own, so that it keeps up
+    with the opponent. Every recheck_interval rounds, the dormant strategies are woken with twice the
+    threshold weight, and go dormant again unless they then do about as well as the best strategy.
+
+    Dormancy only saves the calls to next_code: every strategy still pays for record_codes every round,
+    so the cost of a round keeps a part in proportion to the whole ensemble. For strategies such as the
+    Markov players, whose guesses cost more than their updates, this still makes large ensembles with a
+    few useful strategies much cheaper.
+    """
+    strategies: InitVar[list[AbstractPlayer]]
+    learning_rate: float = 0.1
+    threshold: float = 1e-3
+    recheck_interval: int = 100
+    deterministic: bool = False
+
+    _strategies: list[AbstractPlayer] = field(init=False, repr=False)
+
+    # The factor by which a strategy's weight is multiplied after a round, indexed by (guess - opponent) % 3.
+    _multipliers: tuple[float, ...] = field(init=False, repr=False)
+
+    # The weights of the strategies, the indices of the strategies consulted and of the dormant ones,
+    # the guesses of the consulted strategies this round, and the number of rounds recorded.
+    _weights: list[float] = field(init=False, repr=False)
+    _active: list[int] = field(init=False, repr=False)
+    _dormant: list[int] = field(init=False, repr=False)
+    _current_guesses: list[int] = field(init=False, repr=False)
+    _rounds: int = field(init=False, default=0)
+
+    # Whether the strategies were consulted for the round being played, as in EnsemblePlayer.
+    _consulted: bool = field(init=False, default=False)
+
+    def __post_init__(self, strategies: list[AbstractPlayer]):
+        super(HedgeEnsemblePlayer, self).__post_init__()
+        if not strategies:
+            raise ValueError(f'Player {self.name} has no strategies.')
+        if self.learning_rate <= 0:
+            raise ValueError(f'Illegal learning rate for player {self.name}: {self.learning_rate}')
+        if not 0 <= self.threshold < 1:
+            raise ValueError(f'Illegal threshold for player {self.name}: {self.threshold}')
+        if self.recheck_interval < 1:
+            raise ValueError(f'Illegal recheck interval for player {self.name}: {self.recheck_interval}')
+        self._strategies = list(strategies)
+        self._multipliers = (1.0, exp(self.learning_rate), exp(-self.learning_rate))
+        self._reset_weights()
+        self.set_rng(self.rng)
+
+    def _reset_weights(self) -> None:
+        self._weights = [1.0] * len(self._strategies)
+        self._active = list(range(len(self._strategies)))
+        self._dormant = []
+        self._current_guesses = []
+        self._rounds = 0
+        self._consulted = False
+
+    def set_rng(self, rng: RandomSource) -> None:
+        """
+        Set the source of randomness for the ensemble, and give each strategy a stream split from it.
+        """
+        super(HedgeEnsemblePlayer, self).set_rng(rng)
+        for strategy in self._strategies:
+            strategy.set_rng(split_rng(self.rng))
+
+    def reset(self) -> None:
+        for strategy in self._strategies:
+            strategy.reset()
+        self._reset_weights()
+
+    def get_strategies(self) -> list[AbstractPlayer]:
+        """
+        Return the strategies of the ensemble, as it was given them.
+        """
+        return list(self._strategies)
+
+    def estimated_cost(self) -> float:
+        # Every strategy records every round, even when it is dormant.
+        return 1.0 + sum(strategy.estimated_cost() for strategy in self._strategies)
+
+    def clone(self, rng: RandomSource = None) -> 'HedgeEnsemblePlayer':
+        """
+        Return a fresh copy of the ensemble with clones of its strategies, as EnsemblePlayer.clone does.
+        """
+        clone = copy.copy(self)
+        clone.rng = copy.copy(self.rng) if rng is None else make_rng(rng)
+        clone._strategies = _clone_strategies(self._strategies, None if rng is None else clone.rng)
+        clone._reset_weights()
+        return clone
+
+    def get_state(self) -> dict[str, Any]:
+        return {**super(HedgeEnsemblePlayer, self).get_state(),
+                'strategies': [strategy.get_state() for strategy in self._strategies],
+                'banks': [bank.get_state() for bank in _banks(self._strategies)],
+                'weights': list(self._weights),
+                'active': list(self._active),
+                'dormant': list(self._dormant),
+                'current_guesses': list(self._current_guesses),
+                'rounds': self._rounds,
+                'consulted': self._consulted}
+
+    def set_state(self, state: dict[str, Any]) -> None:
+        if len(state['strategies']) != len(self._strategies):
+            raise ValueError(f'State has {len(state["strategies"])} strategies instead of {len(self._strategies)}')
+        super(HedgeEnsemblePlayer, self).set_state(state)
+        for strategy, strategy_state in zip(self._strategies, state['strategies']):
+            strategy.set_state(strategy_state)
+        _set_bank_states(self._strategies, state['banks'])
+        self._weights = list(state['weights'])
+        self._active = list(state['active'])
+        self._dormant = list(state['dormant'])
+        self._current_guesses = list(state['current_guesses'])
+        self._rounds = state['rounds']
+        self._consulted = state['consulted']
+
+    def next_move(self, round_number: int) -> RPS:
+        return SYMBOLS[self.next_code(round_number)]
+
+    def next_code(self, round_number: int) -> int:
+        # Consult the strategies that are not dormant, and put their weights behind their guesses.
+        self._consulted = True
+        strategies = self._strategies
+        weights = self._weights
+        self._current_guesses = current_guesses = []
+        votes = [0.0] * NUM_SYMBOLS
+        for index in self._active:
+            guess = strategies[index].next_code(round_number)
+            current_guesses.append(guess)
+            votes[guess] += weights[index]
+
+        if self.deterministic:
+            return max(range(NUM_SYMBOLS), key=votes.__getitem__)
+        return draw_from_counts(votes[0], votes[1], sum(votes), self.rng)
+
+    def record_round(self, round_number: int, player_symbol: RPS, opponent_symbol: RPS) -> None:
+        self.record_codes(round_number, player_symbol.code, opponent_symbol.code)
+
+    def record_codes(self, round_number: int, player_code: int, opponent_code: int) -> None:
+        """
+        Record the round for every strategy, update the weights of those consulted, and then put to sleep
+        those that have fallen below the threshold, or wake the dormant ones if it is time to recheck them.
+        If the ensemble was not consulted for the round, the strategies only record it, as in EnsemblePlayer.
+        """
+        strategies = self._strategies
+        if not self._consulted:
+            for strategy in strategies:
+                strategy.record_codes(round_number, player_code, opponent_code)
+            return
+        self._consulted = False
+        weights = self._weights
+        multipliers = self._multipliers
+        best = 0.0
+        worst = float('inf')
+        for index, guess in zip(self._active, self._current_guesses):
+            strategies[index].record_codes(round_number, guess, opponent_code)
+            weight = weights[index] * multipliers[(guess - opponent_code) % NUM_SYMBOLS]
+            weights[index] = weight
+            if weight > best:
+                best = weight
+            if weight < worst:
+                worst = weight
+        for index in self._dormant:
+            strategies[index].record_codes(round_number, player_code, opponent_code)
+
+        cutoff = best * self.threshold
+        if worst < cutoff:
+            self._dormant.extend(index for index in self._active if weights[index] < cutoff)
+            self._active = [index for index in self._active if weights[index] >= cutoff]
+        if not 1 / _MAX_WEIGHT < best < _MAX_WEIGHT:
+            for index in self._active:
+                weights[index] /= best
+            cutoff /= best
+
+        self._rounds += 1
+        if self._dormant and self._rounds % self.recheck_interval == 0:
+            for index in self._dormant:
+                weights[index] = 2 * cutoff
+            self._active.extend(self._dormant)
+            self._dormant = []
+
+
+def _clone_strategies(strategies: Iterable[AbstractPlayer], rng: Optional[random.Random]) -> list[AbstractPlayer]:
+    """
+    Clone the strategies of an ensemble, where strategies that share a MarkovStrategyBank share a single
+    clone of it. If rng is given, the clones get streams split from it in order, as set_rng gives them.
+    """
+    banks = {}
+    clones = []
+    for strategy in strategies:
+        clone = strategy.clone(None if rng is None else split_rng(rng))
+        if isinstance(clone, BankedMarkovChainPlayer):
+            bank = banks.setdefault(id(strategy.bank), clone.bank)
+            if bank is not clone.bank:
+                clone.share_bank(bank)
+        clones.append(clone)
+    return clones
+
+
+def _banks(strategies: Iterable[AbstractPlayer]) -> list[MarkovStrategyBank]:
+    """
+    Return the distinct banks of the banked strategies of an ensemble, in the order of their first view,
+    so that the state of each is saved once however many views of it there are.
+    """
+    banks: dict[int, MarkovStrategyBank] = {}
+    for strategy in strategies:
+        if isinstance(strategy, BankedMarkovChainPlayer):
+            banks.setdefault(id(strategy.bank), strategy.bank)
+    return list(banks.values())
+
+
+def _set_bank_states(strategies: Iterable[AbstractPlayer], states: list[dict[str, Any]]) -> None:
+    banks = _banks(strategies)
+    if len(states) != len(banks):
+        raise ValueError(f'State has {len(states)} strategy banks instead of {len(banks)}')
+    for bank, bank_state in zip(banks, states):
+        bank.set_state(bank_state)
@@ -0,0 +1,292 @@
+# Copyright (c) 2024 Sebastian Raaphorst.
+# For license information see LICENSE or https://opensource.org/licenses/BSD-3-Clause
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import final, ClassVar, Optional, Sequence, TYPE_CHECKING
+import random
+
+from .abstract_player import AbstractPlayer
+from .batch_player import BatchPlayer
+from rps.common import make_rng, RandomSource, split_rng
+from rps.rps import BEATER, BEATING, NUM_SYMBOLS
+
+if TYPE_CHECKING:
+    import numpy as np
+
+__all__ = [
+    'LanePlayer',
+    'BaseMarkovChainLanes',
+    'MarkovChainLanes',
+    'DoubleMarkovChainLanes',
+    'PreviousSymbolLanes',
+    'BeatPreviousMoveLanes',
+    'BeatenByPreviousMoveLanes',
+    'PlayerLanes',
+]
+
+
+@dataclass(slots=True)
+class LanePlayer(ABC):
+    """
+    A player that plays a number of independent matches, its lanes, at once. Lane i of a lane player
+    only ever sees lane i of its opponent, and the state of all of the lanes is kept in NumPy arrays,
+    so that every round is played in all of the lanes with a handful of array operations instead of
+    one Python call per lane. This is what makes evaluating a strategy against a large population fast.
+
+    The lanes draw their randomness from a NumPy generator seeded from rng, so a lane plays like the
+    corresponding scalar player with the same statistics, but not with the same stream of moves.
+
+    NumPy is required for lane players.
+    """
+    name: str
+    lanes: int
+
+    # Any RandomSource given is converted to a random.Random, as for AbstractPlayer.
+    rng: random.Random = field(default_factory=random.Random, kw_only=True, repr=False, compare=False)
+
+    # The generator for all of the lanes, seeded from rng.
+    _generator: 'np.random.Generator' = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.lanes < 1:
+            raise ValueError(f'Illegal number of lanes for player {self.name}: {self.lanes}')
+        self._seed(self.rng)
+
+    def _seed(self, rng: RandomSource) -> None:
+        import numpy as np
+        self.rng = make_rng(rng)
+        self._generator = np.random.default_rng(self.rng.getrandbits(64))
+
+    def set_rng(self, rng: RandomSource) -> None:
+        """
+        Replace the source of randomness used by the player.
+        """
+        self._seed(rng)
+
+    def reset(self) -> None:
+        """
+        Reset all of the lanes, clearing out any internal data.
+        """
+        pass
+
+    def _random_codes(self, count: int) -> 'np.ndarray':
+        """
+        Return an array of count uniformly random symbol codes.
+        """
+        import numpy as np
+        return self._generator.integers(0, NUM_SYMBOLS, count, dtype=np.int8)
+
+    @abstractmethod
+    def next_codes(self, round_number: int) -> 'np.ndarray':
+        """
+        Return an array of the code of the move in each lane for the round.
+        """
+        pass
+
+    @abstractmethod
+    def record_codes(self, round_number: int, player_codes: 'np.ndarray', opponent_codes: 'np.ndarray') -> None:
+        """
+        Record the codes played in each lane in the round by the player and its opponent.
+        """
+        pass
+
+
+@dataclass(slots=True)
+class BaseMarkovChainLanes(LanePlayer):
+    """
+    The lane version of BaseMarkovChainPlayer, with an array backed count table per lane. The counts
+    take lanes x _radix^chain_length x 4 x 4 bytes, so high chain lengths need few lanes.
+    All of the lanes are always the same number of rounds into their matches, so the history length
+    is shared.
+    """
+    chain_length: int = 1
+
+    # The number of digits a round can contribute to the context.
+    _radix: ClassVar[int]
+
+    # The counts of each symbol code and their total for each context in each lane, the context in
+    # each lane, and the number of rounds of history in the contexts, up to chain_length.
+    _counts: 'np.ndarray' = field(init=False, repr=False)
+    _context: 'np.ndarray' = field(init=False, repr=False)
+    _history_length: int = field(init=False, default=0)
+
+    # The index of each lane, to pick out one row per lane with fancy indexing.
+    _lane_index: 'np.ndarray' = field(init=False, repr=False)
+
+    def __post_init__(self):
+        super(BaseMarkovChainLanes, self).__post_init__()
+        if self.chain_length < 1:
+            raise ValueError(f'Illegal chain length for player {self.name}: {self.chain_length}')
+        import numpy as np
+        self._lane_index = np.arange(self.lanes)
+        self.reset()
+
+    def reset(self) -> None:
+        import numpy as np
+        self._counts = np.zeros((self.lanes, self._radix ** self.chain_length, NUM_SYMBOLS + 1), dtype=np.uint32)
+        self._context = np.zeros(self.lanes, dtype=np.int64)
+        self._history_length = 0
+
+    @abstractmethod
+    def _round_digits(self, player_codes: 'np.ndarray', opponent_codes: 'np.ndarray') -> 'np.ndarray':
+        """
+        Abstract method to determine the digit in [0, _radix) that a round contributes to the context
+        in each lane.
+        """
+        pass
+
+    def next_codes(self, round_number: int) -> 'np.ndarray':
+        if self._history_length < self.chain_length:
+            return self._random_codes(self.lanes)
+
+        # Predict the opponent's next symbol in each lane from the counts as draw_from_counts does,
+        # and play what beats it. Lanes with no counts for their context play randomly.
+        import numpy as np
+        counts = self._counts[self._lane_index, self._context]
+        rock = counts[:, 0]
+        total = counts[:, NUM_SYMBOLS]
+        u = self._generator.random(self.lanes) * total
+        prediction = (u >= rock).astype(np.int8) + (u >= rock + counts[:, 1])
+        codes = (prediction + 1) % NUM_SYMBOLS
+        unseen = total == 0
+        if unseen.any():
+            codes[unseen] = self._random_codes(int(np.count_nonzero(unseen)))
+        return codes
+
+    def record_codes(self, round_number: int, player_codes: 'np.ndarray', opponent_codes: 'np.ndarray') -> None:
+        if self._history_length == self.chain_length:
+            # Each lane increments its own row, so no index repeats and fancy indexing adds correctly.
+            self._counts[self._lane_index, self._context, opponent_codes] += 1
+            self._counts[self._lane_index, self._context, NUM_SYMBOLS] += 1
+        else:
+            self._history_length += 1
+        self._context = ((self._context * self._radix + self._round_digits(player_codes, opponent_codes))
+                         % self._counts.shape[1])
+
+
+@final
+@dataclass(slots=True)
+class MarkovChainLanes(BaseMarkovChainLanes):
+    """
+    The lane version of MarkovChainPlayer, where the opponent's last moves form the key.
+    """
+    _radix: ClassVar[int] = NUM_SYMBOLS
+
+    def _round_digits(self, player_codes: 'np.ndarray', opponent_codes: 'np.ndarray') -> 'np.ndarray':
+        return opponent_codes
+
+
+@final
+@dataclass(slots=True)
+class DoubleMarkovChainLanes(BaseMarkovChainLanes):
+    """
+    The lane version of DoubleMarkovChainPlayer, where both players' last moves form the key.
+    """
+    _radix: ClassVar[int] = NUM_SYMBOLS * NUM_SYMBOLS
+
+    def _round_digits(self, player_codes: 'np.ndarray', opponent_codes: 'np.ndarray') -> 'np.ndarray':
+        return player_codes * NUM_SYMBOLS + opponent_codes
+
+
+@dataclass(slots=True)
+class PreviousSymbolLanes(LanePlayer):
+    """
+    The lane version of PreviousSymbolFunctionPlayer, where the function is a table on symbol codes.
+    """
+    code_function: tuple[int, ...] = BEATER
+
+    # The code function as an array, and the code of the last symbol played by the opponent in each lane.
+    _table: 'np.ndarray' = field(init=False, repr=False)
+    _previous_codes: Optional['np.ndarray'] = field(init=False, default=None, repr=False)
+
+    def __post_init__(self):
+        super(PreviousSymbolLanes, self).__post_init__()
+        if len(self.code_function) != NUM_SYMBOLS:
+            raise ValueError(f'Illegal code function for player {self.name}: {self.code_function}')
+        import numpy as np
+        self._table = np.array(self.code_function, dtype=np.int8)
+
+    def reset(self) -> None:
+        self._previous_codes = None
+
+    def next_codes(self, round_number: int) -> 'np.ndarray':
+        if self._previous_codes is None:
+            return self._random_codes(self.lanes)
+        return self._table[self._previous_codes]
+
+    def record_codes(self, round_number: int, player_codes: 'np.ndarray', opponent_codes: 'np.ndarray') -> None:
+        self._previous_codes = opponent_codes
+
+
+@final
+@dataclass(slots=True)
+class BeatPreviousMoveLanes(PreviousSymbolLanes):
+    def __init__(self, name: str, lanes: int, rng: RandomSource = None):
+        super(BeatPreviousMoveLanes, self).__init__(name=name, lanes=lanes, code_function=BEATER,
+                                                    rng=make_rng(rng))
+
+
+@final
+@dataclass(slots=True)
+class BeatenByPreviousMoveLanes(PreviousSymbolLanes):
+    def __init__(self, name: str, lanes: int, rng: RandomSource = None):
+        super(BeatenByPreviousMoveLanes, self).__init__(name=name, lanes=lanes, code_function=BEATING,
+                                                        rng=make_rng(rng))
+
+
+@final
+@dataclass(slots=True)
+class PlayerLanes(LanePlayer):
+    """
+    Lanes made of ordinary players, one per lane, so that any population can be the opponent of a lane
+    player. The players keep their own streams, until set_rng gives each a stream split from the new rng.
+
+    If all of the players are batch players, their moves are produced chunk_size rounds at a time and
+    nothing is recorded. Otherwise, the players are called one by one in every round, which runs at
+    interpreter speed, so the more of a population that has a lane version, the better.
+    """
+    lanes: int = field(init=False, default=0)
+    players: Sequence[AbstractPlayer] = ()
+    chunk_size: int = 1024
+
+    # Whether the players are all batch players, and if so, the moves for the current chunk of rounds,
+    # with a row per round, and the round of the first row.
+    _batched: bool = field(init=False, default=False, repr=False)
+    _chunk: Optional['np.ndarray'] = field(init=False, default=None, repr=False)
+    _chunk_start: int = field(init=False, default=0, repr=False)
+
+    def __post_init__(self):
+        self.lanes = len(self.players)
+        self._batched = all(isinstance(player, BatchPlayer) for player in self.players)
+        if self.chunk_size < 1:
+            raise ValueError(f'Illegal chunk size for player {self.name}: {self.chunk_size}')
+        super(PlayerLanes, self).__post_init__()
+
+    def set_rng(self, rng: RandomSource) -> None:
+        super(PlayerLanes, self).set_rng(rng)
+        for player in self.players:
+            player.set_rng(split_rng(self.rng))
+
+    def reset(self) -> None:
+        for player in self.players:
+            player.reset()
+        self._chunk = None
+
+    def next_codes(self, round_number: int) -> 'np.ndarray':
+        import numpy as np
+        if not self._batched:
+            return np.fromiter((player.next_code(round_number) for player in self.players),
+                               dtype=np.int8, count=self.lanes)
+
+        if self._chunk is None or not 0 <= round_number - self._chunk_start < len(self._chunk):
+            self._chunk = np.stack([player.next_codes(round_number, self.chunk_size).astype(np.int8, copy=False)
+                                    for player in self.players], axis=1)
+            self._chunk_start = round_number
+        return self._chunk[round_number - self._chunk_start]
+
+    def record_codes(self, round_number: int, player_codes: 'np.ndarray', opponent_codes: 'np.ndarray') -> None:
+        if self._batched:
+            return
+        for player, player_code, opponent_code in zip(self.players, player_codes.tolist(), opponent_codes.tolist()):
+            player.record_codes(round_number, player_code, opponent_code)
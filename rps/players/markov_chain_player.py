@@ -1,30 +1,23 @@
 # Copyright (c) 2024 Sebastian Raaphorst.
 # For license information see LICENSE or https://opensource.org/licenses/BSD-3-Clause
 
-from collections import Counter
 from dataclasses import dataclass
-from typing import final
+from typing import final, ClassVar
 
 from .base_markov_chain_player import BaseMarkovChainPlayer
-from rps.rps import RPS
+from rps.rps import NUM_SYMBOLS
 
 __all__ = ['MarkovChainPlayer']
 
 
 @final
-@dataclass
+@dataclass(slots=True)
 class MarkovChainPlayer(BaseMarkovChainPlayer):
     """
     Markov chain player using the specified chain length, where the opponent's last moves
     form the key.
     """
-    def _get_transition_key(self) -> tuple[RPS, ...]:
-        return self._other_tuple
+    _radix: ClassVar[int] = NUM_SYMBOLS
 
-    def record_round(self, round_number: int, player_symbol: RPS, opponent_symbol: RPS) -> None:
-        if len(self._other_tuple) == self.chain_length:
-            ctr = self._count_matrix.setdefault(self._other_tuple, Counter())
-            ctr[opponent_symbol] += 1
-            self._other_tuple = self._other_tuple[1:] + (opponent_symbol,)
-        else:
-            self._other_tuple += (opponent_symbol,)
+    def _round_digit(self, player_code: int, opponent_code: int) -> int:
+        return opponent_code
@@ -0,0 +1,224 @@
+# Copyright (c) 2024 Sebastian Raaphorst.
+# For license information see LICENSE or https://opensource.org/licenses/BSD-3-Clause
+
+from array import array
+from dataclasses import dataclass, field
+from typing import final, Any, Optional
+import copy
+import random
+
+from .abstract_player import AbstractPlayer
+from .count_table import COUNTS_STRIDE, draw_from_counts
+from .prior_table import PriorTable
+from rps.rps import BEATER, code_random, NUM_SYMBOLS, RPS, SYMBOLS
+
+__all__ = [
+    'MarkovStrategyBank',
+    'BankedMarkovChainPlayer',
+]
+
+
+@final
+@dataclass(slots=True)
+class MarkovStrategyBank:
+    """
+    A shared opponent history and the count tables for Markov chains of every order from 1 to max_order.
+
+    The history is a single rolling base-3 context of the opponent's last max_order symbols, with the
+    most recent symbol as the lowest digit, so the context for order k is the context modulo 3^k, and
+    a round updates the tables for all the orders in a single pass.
+
+    The tables for all the orders are laid out one after the other in a single flat array, as in
+    ArrayCountTable, which is a flattened trie of the contexts. This takes 24 * 3^max_order bytes,
+    e.g. 1.4 MiB for max_order 10.
+
+    The chains are used through BankedMarkovChainPlayer views, which behave exactly like the
+    MarkovChainPlayer of the same chain length. All the views of a bank must play in the same match,
+    e.g. as the strategies of an EnsemblePlayer, and record every round: the bank counts the views made
+    of it, and records a round when the first of them records it, ignoring the others.
+
+    If prior is set, the counts of every order are warm-started from those of the prior table, which
+    must be for single Markov chains, whenever the bank is reset. Its tables have the same layout, so
+    this is a single copy.
+    """
+    max_order: int
+    prior: Optional[PriorTable] = field(default=None, repr=False, compare=False)
+
+    # The counts for all the orders. The count of code after context for order k is at index
+    # _offsets[k - 1] + 4 * context + code, and their running total at _offsets[k - 1] + 4 * context + 3.
+    _counts: array = field(init=False, repr=False)
+
+    # The offsets and context moduli of the orders, indexed by order - 1.
+    _offsets: list[int] = field(init=False, repr=False)
+    _moduli: list[int] = field(init=False, repr=False)
+
+    # The context, and the number of rounds of history in it, up to max_order.
+    _context: int = field(init=False, default=0)
+    _history_length: int = field(init=False, default=0)
+
+    # The number of views of the bank, and of the views yet to record the round last recorded, which
+    # are ignored. This does not rely on round numbers, which start over in each match.
+    _views: int = field(init=False, default=0)
+    _pending: int = field(init=False, default=0)
+
+    def __post_init__(self):
+        if self.max_order < 1:
+            raise ValueError(f'Illegal maximum order for bank: {self.max_order}')
+        if self.prior is not None and (self.prior.radix != NUM_SYMBOLS or self.prior.max_order < self.max_order):
+            raise ValueError(f'Prior table of radix {self.prior.radix} and maximum order {self.prior.max_order} '
+                             f'does not fit a bank of maximum order {self.max_order}')
+        self._moduli = [NUM_SYMBOLS ** order for order in range(1, self.max_order + 1)]
+        self._offsets = [0]
+        for modulus in self._moduli[:-1]:
+            self._offsets.append(self._offsets[-1] + COUNTS_STRIDE * modulus)
+        self._clear_counts()
+
+    def _clear_counts(self) -> None:
+        size = self._offsets[-1] + COUNTS_STRIDE * self._moduli[-1]
+        self._counts = array('I')
+        if self.prior is None:
+            self._counts.frombytes(bytes(4 * size))
+        else:
+            # The orders of the prior are laid out one after the other from order 1, as in the bank.
+            for order in range(1, self.max_order + 1):
+                self._counts.frombytes(self.prior.raw_counts(order))
+
+    def reset(self) -> None:
+        """
+        Clear the history and counts. Resetting an already clear bank does nothing, so that the
+        tables are only cleared once when all the views are reset.
+        """
+        if self._history_length == 0 and self._pending == 0:
+            return
+        self._clear_counts()
+        self._context = 0
+        self._history_length = 0
+        self._pending = 0
+
+    def clone(self) -> 'MarkovStrategyBank':
+        """
+        Return an independent, clear copy of the bank, with no views.
+        """
+        clone = copy.copy(self)
+        clone._clear_counts()
+        clone._context = 0
+        clone._history_length = 0
+        clone._views = 0
+        clone._pending = 0
+        return clone
+
+    def get_state(self) -> dict[str, Any]:
+        """
+        Return the history and counts as plain data that shares nothing mutable with the bank.
+        """
+        return {'counts': self._counts.tobytes(),
+                'context': self._context,
+                'history_length': self._history_length,
+                'pending': self._pending}
+
+    def set_state(self, state: dict[str, Any]) -> None:
+        """
+        Restore the history and counts from get_state of a bank of the same maximum order.
+        """
+        counts = array('I', state['counts'])
+        if len(counts) != len(self._counts):
+            raise ValueError(f'State is not that of a bank of maximum order {self.max_order}')
+        self._counts = counts
+        self._context = state['context']
+        self._history_length = state['history_length']
+        self._pending = state['pending']
+
+    def record(self, round_number: int, opponent_code: int) -> None:
+        """
+        Record the opponent's symbol code for a round in the chains of every order, once for all the views.
+        """
+        if self._pending:
+            self._pending -= 1
+            return
+        self._pending = self._views - 1
+
+        context = self._context
+        counts = self._counts
+        for offset, modulus in zip(self._offsets[:self._history_length], self._moduli):
+            index = offset + COUNTS_STRIDE * (context % modulus)
+            counts[index + opponent_code] += 1
+            counts[index + NUM_SYMBOLS] += 1
+
+        if self._history_length < self.max_order:
+            self._history_length += 1
+        self._context = (context * NUM_SYMBOLS + opponent_code) % self._moduli[-1]
+
+    def draw(self, order: int, rng: random.Random) -> Optional[int]:
+        """
+        Predict the opponent's next symbol code with the chain of the given order, or return None if
+        there is not enough history, or the context has never been seen.
+        """
+        if self._history_length < order:
+            return None
+
+        # Draw exactly as the count tables do.
+        index = self._offsets[order - 1] + COUNTS_STRIDE * (self._context % self._moduli[order - 1])
+        counts = self._counts
+        total = counts[index + NUM_SYMBOLS]
+        if not total:
+            return None
+        return draw_from_counts(counts[index], counts[index + 1], total, rng)
+
+    def players(self, name_prefix: str = 'Bank') -> list['BankedMarkovChainPlayer']:
+        """
+        Create views of the chains of every order, named name_prefix-1, ..., name_prefix-max_order.
+        """
+        return [BankedMarkovChainPlayer(name=f'{name_prefix}-{order}', bank=self, chain_length=order)
+                for order in range(1, self.max_order + 1)]
+
+
+@final
+@dataclass(slots=True)
+class BankedMarkovChainPlayer(AbstractPlayer):
+    """
+    A view of the chain of one order in a MarkovStrategyBank, which plays exactly like a
+    MarkovChainPlayer of that chain length.
+
+    The state of a view is only that of its rng, as the bank is shared by all of its views. Whoever holds
+    the views saves the state of the bank once, as EnsemblePlayer does, through get_state of the bank.
+    """
+    bank: MarkovStrategyBank = field(repr=False)
+    chain_length: int = 1
+
+    def __post_init__(self):
+        super(BankedMarkovChainPlayer, self).__post_init__()
+        if not 1 <= self.chain_length <= self.bank.max_order:
+            raise ValueError(f'Illegal chain length for player {self.name}: {self.chain_length}')
+        self.bank._views += 1
+
+    def share_bank(self, bank: MarkovStrategyBank) -> None:
+        """
+        Make the view one of another bank of the same maximum order, e.g. so that the clones of views
+        that shared a bank share a single clone of it.
+        """
+        self.bank = bank
+        bank._views += 1
+
+    def reset(self) -> None:
+        self.bank.reset()
+
+    def _copy_internals(self) -> None:
+        # Views that should share a bank, e.g. those in an ensemble, must be given the same clone of it
+        # afterwards with share_bank, as EnsemblePlayer.clone does.
+        self.bank = self.bank.clone()
+        self.bank._views += 1
+
+    def next_move(self, round_number: int) -> RPS:
+        return SYMBOLS[self.next_code(round_number)]
+
+    def next_code(self, round_number: int) -> int:
+        prediction = self.bank.draw(self.chain_length, self.rng)
+        if prediction is None:
+            return code_random(self.rng)
+        return BEATER[prediction]
+
+    def record_round(self, round_number: int, player_symbol: RPS, opponent_symbol: RPS) -> None:
+        self.record_codes(round_number, player_symbol.code, opponent_symbol.code)
+
+    def record_codes(self, round_number: int, player_code: int, opponent_code: int) -> None:
+        self.bank.record(round_number, opponent_code)
@@ -2,9 +2,17 @@
 # For license information see LICENSE or https://opensource.org/licenses/BSD-3-Clause
 
 from dataclasses import dataclass, field
-from typing import final, Callable, Sequence
+from functools import partial
+from typing import final, Callable, Optional, Sequence, TYPE_CHECKING
 
 from .abstract_player import *
+from .batch_player import BatchPlayer
+from rps.common import make_rng, RandomSource
+from rps.rps import NUM_SYMBOLS
+
+if TYPE_CHECKING:
+    import numpy as np
+    from rps.analysis import StateMachine
 
 __all__ = [
     'FunctionPlayer',
@@ -12,7 +20,7 @@ __all__ = [
 ]
 
 
-@dataclass
+@dataclass(slots=True)
 class FunctionPlayer(AbstractPlayer):
     """
     A flexible pattern player that takes a function that, given the round number, returns a symbol.
@@ -25,13 +33,35 @@ class FunctionPlayer(AbstractPlayer):
         return self.symbol_producer(round_number)
 
 
+def _pattern_symbol(pattern: tuple[RPS, ...], round_number: int) -> RPS:
+    return pattern[round_number % len(pattern)]
+
+
 @final
-@dataclass
-class PatternPlayer(FunctionPlayer):
+@dataclass(slots=True)
+class PatternPlayer(FunctionPlayer, BatchPlayer):
     """
     An implementation of FunctionPlayer that allows for a pattern that:
     1. Has an initial pattern.
     2. Then has a pattern that cycles beyond what a fixed-length Markov chain could recognize.
     """
-    def __init__(self, name: str, pattern: Sequence[RPS]):
-        super().__init__(name, lambda x: pattern[x % len(pattern)])
+    _pattern_codes: tuple[int, ...] = field(init=False, repr=False, default=())
+
+    def __init__(self, name: str, pattern: Sequence[RPS], rng: RandomSource = None):
+        # A partial of a module-level function rather than a lambda so that the player can be pickled.
+        super(PatternPlayer, self).__init__(name, partial(_pattern_symbol, tuple(pattern)), rng=make_rng(rng))
+        self._pattern_codes = tuple(sym.code for sym in pattern)
+
+    def next_codes(self, round_number: int, count: int) -> 'np.ndarray':
+        import numpy as np
+        # Rotate the pattern to start at round_number, and tile it to cover the rounds.
+        offset = round_number % len(self._pattern_codes)
+        pattern_codes = np.array(self._pattern_codes[offset:] + self._pattern_codes[:offset], dtype=np.int8)
+        return np.tile(pattern_codes, -(-count // len(pattern_codes)))[:count]
+
+    def state_machine(self) -> Optional['StateMachine']:
+        from rps.analysis import StateMachine
+        # The state is the position in the pattern, whatever the opponent plays.
+        length = len(self._pattern_codes)
+        return StateMachine(outputs=self._pattern_codes,
+                            transitions=tuple(((state + 1) % length,) * NUM_SYMBOLS for state in range(length)))
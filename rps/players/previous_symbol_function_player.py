@@ -1,11 +1,15 @@
 # Copyright (c) 2024 Sebastian Raaphorst.
 # For license information see LICENSE or https://opensource.org/licenses/BSD-3-Clause
 
-from dataclasses import dataclass
-from typing import final, Callable, Optional
+from dataclasses import dataclass, field
+from typing import final, Any, Callable, Optional, TYPE_CHECKING
 
 from .abstract_player import AbstractPlayer
-from rps.rps import rps_beater, rps_beating, rps_random, RPS
+from rps.common import make_rng, RandomSource
+from rps.rps import BEATER, BEATING, code_random, NUM_SYMBOLS, rps_beater, rps_beating, RPS, SYMBOLS
+
+if TYPE_CHECKING:
+    from rps.analysis import StateMachine
 
 __all__ = [
     'PreviousSymbolFunctionPlayer',
@@ -14,33 +18,72 @@ __all__ = [
 ]
 
 
-@dataclass
+@dataclass(slots=True)
 class PreviousSymbolFunctionPlayer(AbstractPlayer):
     """
     A player that invokes a function based on the last symbol played by the opponent to determine
     the next symbol to play.
     """
     function: Callable[[RPS], RPS]
-    _previous_move: Optional[RPS] = None
+
+    # The code of the last symbol played by the opponent.
+    _previous_code: Optional[int] = None
+
+    # If the function is one of the symbol tables, the table for the function on symbol codes.
+    _code_function: Optional[tuple[int, ...]] = field(init=False, default=None)
+
+    def reset(self) -> None:
+        self._previous_code = None
+
+    def get_state(self) -> dict[str, Any]:
+        return {**super(PreviousSymbolFunctionPlayer, self).get_state(),
+                'previous_code': self._previous_code}
+
+    def set_state(self, state: dict[str, Any]) -> None:
+        super(PreviousSymbolFunctionPlayer, self).set_state(state)
+        self._previous_code = state['previous_code']
+
+    def state_machine(self) -> Optional['StateMachine']:
+        """
+        State c is having last seen the opponent play c, and state 3 + c is playing c in the first round,
+        which is one of the initial states at random. An arbitrary function may not be deterministic,
+        so only players with a code function are state machines.
+        """
+        if self._code_function is None:
+            return None
+        from rps.analysis import StateMachine
+        return StateMachine(outputs=self._code_function + tuple(range(NUM_SYMBOLS)),
+                            transitions=(tuple(range(NUM_SYMBOLS)),) * (2 * NUM_SYMBOLS),
+                            initial_states=tuple(range(NUM_SYMBOLS, 2 * NUM_SYMBOLS)))
 
     def next_move(self, round_number: int) -> RPS:
-        if self._previous_move is None:
-            return rps_random()
-        return self.function(self._previous_move)
+        return SYMBOLS[self.next_code(round_number)]
+
+    def next_code(self, round_number: int) -> int:
+        if self._previous_code is None:
+            return code_random(self.rng)
+        if self._code_function is not None:
+            return self._code_function[self._previous_code]
+        return self.function(SYMBOLS[self._previous_code]).code
 
     def record_round(self, round_number: int, player_symbol: RPS, opponent_symbol: RPS) -> None:
-        self._previous_move = opponent_symbol
+        self._previous_code = opponent_symbol.code
+
+    def record_codes(self, round_number: int, player_code: int, opponent_code: int) -> None:
+        self._previous_code = opponent_code
 
 
 @final
-@dataclass
+@dataclass(slots=True)
 class BeatPreviousMovePlayer(PreviousSymbolFunctionPlayer):
-    def __init__(self, name: str):
-        super().__init__(name=name, function=rps_beater)
+    def __init__(self, name: str, rng: RandomSource = None):
+        super(BeatPreviousMovePlayer, self).__init__(name=name, function=rps_beater, rng=make_rng(rng))
+        self._code_function = BEATER
 
 
 @final
-@dataclass
+@dataclass(slots=True)
 class BeatenByPreviousMovePlayer(PreviousSymbolFunctionPlayer):
-    def __init__(self, name: str):
-        super().__init__(name=name, function=rps_beating)
+    def __init__(self, name: str, rng: RandomSource = None):
+        super(BeatenByPreviousMovePlayer, self).__init__(name=name, function=rps_beating, rng=make_rng(rng))
+        self._code_function = BEATING
@@ -0,0 +1,253 @@
+# Copyright (c) 2024 Sebastian Raaphorst.
+# For license information see LICENSE or https://opensource.org/licenses/BSD-3-Clause
+
+from array import array
+from dataclasses import dataclass, field
+from hashlib import sha256
+from os import PathLike
+from typing import final, Final, Optional, Sequence, TYPE_CHECKING, Union
+import mmap
+import struct
+import sys
+
+from .count_table import COUNTS_STRIDE
+from rps.rps import NUM_SYMBOLS
+
+if TYPE_CHECKING:
+    import numpy as np
+    from rps.match import MatchLog
+
+__all__ = [
+    'PriorTable',
+    'PriorTrainer',
+]
+
+# The format of a prior table file is:
+# * a fixed header: the magic bytes, the format version, the radix, the maximum order, and padding; and
+# * for each order k from 1 to the maximum order, radix^k contexts of three counts and their total, as
+#   little-endian unsigned 32-bit ints, in the layout of ArrayCountTable.
+# The header is 8 bytes, so the counts are aligned for memory-mapping.
+_MAGIC: Final[bytes] = b'RPSP'
+_VERSION: Final[int] = 1
+_HEADER: Final[struct.Struct] = struct.Struct('<4sBBBx')
+
+# The radixes of the contexts of single and double Markov chains.
+_RADIXES: Final[tuple[int, ...]] = (NUM_SYMBOLS, NUM_SYMBOLS * NUM_SYMBOLS)
+
+
+def _as_codes(codes: Sequence[int]) -> 'np.ndarray':
+    import numpy as np
+    if isinstance(codes, (bytes, bytearray, memoryview)):
+        return np.frombuffer(codes, dtype=np.uint8).astype(np.int64)
+    return np.asarray(codes, dtype=np.int64)
+
+
+def _order_offsets(radix: int, max_order: int) -> list[int]:
+    """
+    The offsets in ints of the counts of each order, followed by the total number of ints.
+    """
+    offsets = [0]
+    for order in range(1, max_order + 1):
+        offsets.append(offsets[-1] + COUNTS_STRIDE * radix ** order)
+    return offsets
+
+
+@final
+class PriorTable:
+    """
+    Counts of the symbol codes played after each context, for the Markov chains of every order from 1
+    to max_order, used to warm-start players, which load the counts of their order whenever they are
+    reset. The radix is 3 for MarkovChainPlayer, whose contexts are the opponent's moves, and 9 for
+    DoubleMarkovChainPlayer, whose contexts are both players' moves, and the contexts are encoded as
+    by those players.
+
+    Tables are built by a PriorTrainer, and saved to and memory-mapped from files, so loading a table
+    costs nothing until its counts are used. The buffer holds the counts little-endian, as the file does.
+    """
+    def __init__(self, radix: int, max_order: int, buffer: Union[bytes, memoryview], path: Optional[str] = None):
+        if radix not in _RADIXES:
+            raise ValueError(f'Illegal radix for prior table: {radix}')
+        if max_order < 1:
+            raise ValueError(f'Illegal maximum order for prior table: {max_order}')
+        self.radix = radix
+        self.max_order = max_order
+        self._offsets = _order_offsets(radix, max_order)
+        if len(buffer) != 4 * self._offsets[-1]:
+            raise ValueError(f'Prior table has {len(buffer)} bytes of counts instead of {4 * self._offsets[-1]}')
+        self._buffer = buffer
+        self._path = path
+
+        # The seen contexts and their counts for each order, built on first use, and the digest.
+        self._seen: dict[int, dict[int, tuple[int, ...]]] = {}
+        self._digest: Optional[str] = None
+
+    @staticmethod
+    def load(path: Union[str, PathLike]) -> 'PriorTable':
+        """
+        Memory-map a table saved by save. The counts stay little-endian, as in the file, on every host.
+        """
+        with open(path, 'rb') as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, radix, max_order = _HEADER.unpack_from(mapped)
+        if magic != _MAGIC:
+            raise ValueError(f'Not a prior table: {path}')
+        if version != _VERSION:
+            raise ValueError(f'Unsupported prior table version {version}: {path}')
+        counts = memoryview(mapped)[_HEADER.size:]
+        return PriorTable(radix, max_order, counts, str(path))
+
+    def save(self, path: Union[str, PathLike]) -> None:
+        with open(path, 'wb') as file:
+            file.write(_HEADER.pack(_MAGIC, _VERSION, self.radix, self.max_order))
+            file.write(self._buffer)
+
+    def __reduce__(self):
+        # Memory-mapped tables are pickled by their path, e.g. to send players to worker processes.
+        if self._path is not None:
+            return PriorTable.load, (self._path,)
+        return PriorTable, (self.radix, self.max_order, bytes(self._buffer))
+
+    def digest(self) -> str:
+        """
+        Return a hash of the contents of the table, which identifies it wherever it is stored.
+        """
+        if self._digest is None:
+            digest = sha256(_HEADER.pack(_MAGIC, _VERSION, self.radix, self.max_order))
+            digest.update(self._buffer)
+            self._digest = digest.hexdigest()
+        return self._digest
+
+    def _check_order(self, order: int) -> None:
+        if not 1 <= order <= self.max_order:
+            raise ValueError(f'Prior table has no order {order}, as its maximum order is {self.max_order}')
+
+    def raw_counts(self, order: int) -> memoryview:
+        """
+        Return the counts of the given order as bytes, in the layout of ArrayCountTable, i.e. in the byte
+        order of the host. The table keeps its counts little-endian, so on big-endian hosts this is a
+        byteswapped copy.
+        """
+        self._check_order(order)
+        counts = memoryview(self._buffer)[4 * self._offsets[order - 1]:4 * self._offsets[order]]
+        if sys.byteorder == 'little':
+            return counts
+        swapped = array('I')
+        swapped.frombytes(counts)
+        swapped.byteswap()
+        return memoryview(swapped).cast('B')
+
+    def seen(self, order: int) -> dict[int, tuple[int, ...]]:
+        """
+        Return the counts and total of each context of the given order that has been seen.
+        """
+        seen = self._seen.get(order)
+        if seen is None:
+            counts = array('I')
+            counts.frombytes(self.raw_counts(order))
+            seen = self._seen[order] = {index // COUNTS_STRIDE: tuple(counts[index:index + COUNTS_STRIDE])
+                                        for index in range(0, len(counts), COUNTS_STRIDE)
+                                        if counts[index + NUM_SYMBOLS]}
+        return seen
+
+    def capped(self, max_total: int) -> 'PriorTable':
+        """
+        Return a copy of the table with the counts of each context scaled down, keeping their proportions,
+        so that they total at most max_total. A prior trained on a large archive would otherwise take
+        longer to overcome than the match lasts, when the opponent plays differently.
+        """
+        import numpy as np
+        if max_total < 1:
+            raise ValueError(f'Illegal maximum total: {max_total}')
+        counts = np.frombuffer(self._buffer, dtype='<u4').reshape(-1, COUNTS_STRIDE).astype(np.float64)
+        totals = counts[:, NUM_SYMBOLS:]
+        scale = np.minimum(1.0, max_total / np.maximum(totals, 1))
+        capped = np.rint(counts[:, :NUM_SYMBOLS] * scale).astype('<u4')
+        result = np.empty((len(counts), COUNTS_STRIDE), dtype='<u4')
+        result[:, :NUM_SYMBOLS] = capped
+        result[:, NUM_SYMBOLS] = capped.sum(axis=1)
+        return PriorTable(self.radix, self.max_order, result.tobytes())
+
+
+@final
+@dataclass
+class PriorTrainer:
+    """
+    Builds a PriorTable for the chains of every order up to max_order from archived histories in a
+    single vectorized pass over each, requiring NumPy. If double is set, the table is for double Markov
+    chains, and otherwise for single Markov chains.
+
+    Each history is the sequence of codes played by the player being warm-started, and the sequence
+    played by its opponent, whose moves are what the table counts.
+    """
+    max_order: int
+    double: bool = False
+
+    # The counts of each order, as flat arrays in the layout of ArrayCountTable, without the totals.
+    _counts: list['np.ndarray'] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        import numpy as np
+        if self.max_order < 1:
+            raise ValueError(f'Illegal maximum order for prior trainer: {self.max_order}')
+        self._counts = [np.zeros(COUNTS_STRIDE * self.radix ** order, dtype=np.uint64)
+                        for order in range(1, self.max_order + 1)]
+
+    @property
+    def radix(self) -> int:
+        return _RADIXES[self.double]
+
+    def add(self, player_codes: Sequence[int], opponent_codes: Sequence[int]) -> None:
+        """
+        Count a complete history.
+        """
+        self._add(player_codes, opponent_codes, 0)
+
+    def _add(self, player_codes: Sequence[int], opponent_codes: Sequence[int], history: int) -> None:
+        """
+        Count a part of a history, of which the first history rounds were counted by an earlier part
+        and are only there as context.
+        """
+        import numpy as np
+        opponent = _as_codes(opponent_codes)
+        if self.double:
+            player = _as_codes(player_codes)
+            if len(player) != len(opponent):
+                raise ValueError(f'Histories have different lengths: {len(player)} and {len(opponent)}')
+            digits = player * NUM_SYMBOLS + opponent
+        else:
+            digits = opponent
+        rounds = len(digits)
+
+        # The context of each round for order k is that for order k - 1 plus the digit k rounds before.
+        contexts = np.zeros(rounds, dtype=np.int64)
+        for order, counts in enumerate(self._counts, 1):
+            if order > rounds:
+                break
+            contexts[order:] += self.radix ** (order - 1) * digits[:rounds - order]
+            start = max(order, history)
+            indices = COUNTS_STRIDE * contexts[start:] + opponent[start:]
+            counts += np.bincount(indices, minlength=len(counts)).astype(np.uint64)
+
+    def add_log(self, log: 'MatchLog', opponent: int = 2, chunk_size: int = 1 << 20) -> None:
+        """
+        Count the history of a match log from the perspective of the opponent of player 1 or 2, a chunk at
+        a time, so that logs much larger than memory can be used.
+        """
+        if opponent not in (1, 2):
+            raise ValueError(f'Illegal player: {opponent}')
+        player = 3 - opponent
+        for start in range(0, log.rounds, chunk_size):
+            history = min(start, self.max_order)
+            self._add(log.codes(player, start - history, start + chunk_size),
+                      log.codes(opponent, start - history, start + chunk_size), history)
+
+    def table(self) -> PriorTable:
+        """
+        Return the table of the counts so far, which must each fit in 32 bits.
+        """
+        import numpy as np
+        counts = np.concatenate(self._counts).reshape(-1, COUNTS_STRIDE)
+        counts[:, NUM_SYMBOLS] = counts[:, :NUM_SYMBOLS].sum(axis=1)
+        if len(counts) and counts[:, NUM_SYMBOLS].max() >= 1 << 32:
+            raise OverflowError('Counts do not fit in 32 bits, so the histories must be capped or split.')
+        return PriorTable(self.radix, self.max_order, counts.astype('<u4').tobytes())
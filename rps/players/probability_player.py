@@ -3,11 +3,15 @@
 
 from dataclasses import dataclass, field
 from math import fabs
-from typing import final, ClassVar
+from typing import final, ClassVar, Optional, TYPE_CHECKING
 
-from .abstract_player import AbstractPlayer
-from rps.common import probability_selector
-from rps.rps import rps_random, RPS
+from .batch_player import BatchPlayer
+from rps.common import AliasTable, make_rng, RandomSource
+from rps.rps import NUM_SYMBOLS, RPS, SYMBOLS
+
+if TYPE_CHECKING:
+    import numpy as np
+    from rps.analysis import StateMachine
 
 __all__ = [
     'ProbabilityPlayer',
@@ -16,31 +20,62 @@ __all__ = [
 ]
 
 
-@dataclass
-class ProbabilityPlayer(AbstractPlayer):
+@dataclass(slots=True)
+class ProbabilityPlayer(BatchPlayer):
     probability_map: dict[RPS, float]
 
+    # The probability map on symbol codes, and its alias table for sampling a code per move.
+    _code_probability_map: dict[int, float] = field(init=False, repr=False, default_factory=dict)
+    _alias_table: AliasTable[int] = field(init=False, repr=False)
+
     # Threshold for probability to vary from 1.
     _threshold: ClassVar[float] = field(init=False, default=1e-6)
 
     def __post_init__(self):
+        super(ProbabilityPlayer, self).__post_init__()
         if fabs(sum(self.probability_map.values()) - 1) > self._threshold:
             raise ValueError(f'Probability map does not sum to 1: {self.probability_map}')
+        self._code_probability_map = {sym.code: prob for sym, prob in self.probability_map.items()}
+        self._alias_table = AliasTable.from_mapping(self._code_probability_map)
 
     def next_move(self, round_number: int) -> RPS:
-        move = probability_selector(self.probability_map)
-        return move if move is not None else rps_random()
+        return SYMBOLS[self.next_code(round_number)]
+
+    def next_code(self, round_number: int) -> int:
+        return self._alias_table.sample(self.rng)
+
+    def next_codes(self, round_number: int, count: int) -> 'np.ndarray':
+        """
+        Sample the moves from the alias table in one call, which draws exactly as next_code does.
+        """
+        import numpy as np
+        return np.array(self._alias_table.sample_many(self.rng, count), dtype=np.int8)
 
 
 @final
 class RandomPlayer(ProbabilityPlayer):
-    def __init__(self, name: str):
+    __slots__ = ()
+
+    def __init__(self, name: str, rng: RandomSource = None):
         super().__init__(name=name, probability_map={RPS.ROCK: 1.0 / 3.0,
                                                      RPS.PAPER: 1.0 / 3.0,
-                                                     RPS.SCISSORS: 1.0 / 3.0})
+                                                     RPS.SCISSORS: 1.0 / 3.0},
+                         rng=make_rng(rng))
 
 
 @final
 class ConstantPlayer(ProbabilityPlayer):
-    def __init__(self, name: str, symbol: RPS):
-        super().__init__(name=name, probability_map={symbol: 1.0})
+    __slots__ = ()
+
+    def __init__(self, name: str, symbol: RPS, rng: RandomSource = None):
+        super().__init__(name=name, probability_map={symbol: 1.0}, rng=make_rng(rng))
+
+    def state_machine(self) -> Optional['StateMachine']:
+        from rps.analysis import StateMachine
+        (code,) = self._code_probability_map
+        return StateMachine(outputs=(code,), transitions=((0,) * NUM_SYMBOLS,))
+
+    def next_codes(self, round_number: int, count: int) -> 'np.ndarray':
+        import numpy as np
+        (code,) = self._code_probability_map
+        return np.full(count, code, dtype=np.int8)
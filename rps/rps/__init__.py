@@ -2,13 +2,20 @@
 # For license information see LICENSE or https://opensource.org/licenses/BSD-3-Clause
 
 from enum import Enum, IntEnum
-from typing import final
+from typing import final, Final, Optional
 import random
 
 
 __all__ = [
     'Outcome',
     'RPS',
+    'NUM_SYMBOLS',
+    'SYMBOLS',
+    'BEATER',
+    'BEATING',
+    'OUTCOMES',
+    'code_random',
+    'code_compare',
     'rps_random',
     'rps_beater',
     'rps_beating',
@@ -30,49 +37,70 @@ class Outcome(IntEnum):
 class RPS(Enum):
     """
     The choices of symbols to pick.
+    Each symbol also has an integer code in {0, 1, 2}, which is what the hot loops run on.
     """
     ROCK = 'R'
     PAPER = 'P'
     SCISSORS = 'S'
 
+    def __init__(self, symbol: str):
+        # The codes are ordered so that code c is beaten by code (c + 1) % 3.
+        self.code: int = 'RPS'.index(symbol)
 
-def rps_random() -> RPS:
+
+# The integer encoding of the symbols. The tables below are indexed by symbol code.
+NUM_SYMBOLS: Final[int] = len(RPS)
+
+# The symbol for each code.
+SYMBOLS: Final[tuple[RPS, ...]] = tuple(RPS)
+
+# The code of the symbol that beats each code.
+BEATER: Final[tuple[int, ...]] = tuple((code + 1) % NUM_SYMBOLS for code in range(NUM_SYMBOLS))
+
+# The code of the symbol that each code beats.
+BEATING: Final[tuple[int, ...]] = tuple((code - 1) % NUM_SYMBOLS for code in range(NUM_SYMBOLS))
+
+# The outcome for a first code a against a second code b, indexed by (a - b) % 3.
+OUTCOMES: Final[tuple[Outcome, ...]] = (Outcome.TIE, Outcome.WIN, Outcome.LOSE)
+
+
+def code_random(rng: Optional[random.Random] = None) -> int:
+    """
+    Return a random symbol code, using rng if given and the global random module if not.
     """
-    Return a random symbol.
+    return (rng if rng is not None else random).randrange(NUM_SYMBOLS)
+
+
+def code_compare(a: int, b: int) -> Outcome:
+    """
+    Given a play of two symbol codes, return the outcome of the first when compared to the second.
+    """
+    return OUTCOMES[(a - b) % NUM_SYMBOLS]
+
+
+def rps_random(rng: Optional[random.Random] = None) -> RPS:
     """
-    return random.choice(list(RPS))
+    Return a random symbol, using rng if given and the global random module if not.
+    """
+    return SYMBOLS[code_random(rng)]
 
 
 def rps_beater(rps: RPS) -> RPS:
     """
     Given a symbol, determine what will beat it.
     """
-    match rps:
-        case RPS.ROCK: return RPS.PAPER
-        case RPS.PAPER: return RPS.SCISSORS
-        case RPS.SCISSORS: return RPS.ROCK
+    return SYMBOLS[BEATER[rps.code]]
 
 
 def rps_beating(rps: RPS) -> RPS:
     """
     Given a symbol, find the symbol that it beats.
     """
-    match rps:
-        case RPS.ROCK: return RPS.SCISSORS
-        case RPS.PAPER: return RPS.ROCK
-        case RPS.SCISSORS: return RPS.PAPER
+    return SYMBOLS[BEATING[rps.code]]
 
 
 def rps_compare(a: RPS, b: RPS) -> Outcome:
     """
     Given a play of two symbols, return the outcome of the first when compared to the second.
     """
-    match (a, b):
-        case (RPS.ROCK, RPS.PAPER): return Outcome.LOSE
-        case (RPS.ROCK, RPS.SCISSORS): return Outcome.WIN
-        case (RPS.PAPER, RPS.ROCK): return Outcome.WIN
-        case (RPS.PAPER, RPS.SCISSORS): return Outcome.LOSE
-        case (RPS.SCISSORS, RPS.ROCK): return Outcome.LOSE
-        case (RPS.SCISSORS, RPS.PAPER): return Outcome.WIN
-        case _: return Outcome.TIE
-
+    return OUTCOMES[(a.code - b.code) % NUM_SYMBOLS]
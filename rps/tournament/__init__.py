@@ -0,0 +1,7 @@
+# Copyright (c) 2024 Sebastian Raaphorst.
+# For license information see LICENSE or https://opensource.org/licenses/BSD-3-Clause
+
+from .formats import *
+from .population import *
+from .standings import *
+from .tournament import *
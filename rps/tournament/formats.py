@@ -0,0 +1,147 @@
+# Copyright (c) 2024 Sebastian Raaphorst.
+# For license information see LICENSE or https://opensource.org/licenses/BSD-3-Clause
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from math import ceil, log2
+from typing import final, Optional, Sequence, TYPE_CHECKING
+import random
+
+from rps.common import get_all_pairs
+from rps.players import AbstractPlayer
+from rps.rps import Outcome
+
+if TYPE_CHECKING:
+    from .standings import Standings
+    from .tournament import MatchResult
+
+__all__ = [
+    'Pairing',
+    'TournamentFormat',
+    'RoundRobin',
+    'SampledPairings',
+    'Swiss',
+    'Knockout',
+]
+
+# The two players of a match.
+Pairing = tuple[AbstractPlayer, AbstractPlayer]
+
+
+@dataclass(frozen=True)
+class TournamentFormat(ABC):
+    """
+    The way in which the players of a tournament are paired. A tournament is played in stages, where all of
+    the matches of a stage are played before the pairings of the next stage are decided from the results.
+    The order of the players is their seeding.
+    """
+    @abstractmethod
+    def pairings(self, stage: int, players: Sequence[AbstractPlayer], standings: 'Standings',
+                 results: Sequence['MatchResult'], rng: random.Random) -> list[Pairing]:
+        """
+        Return the pairings of the stage, given the standings and the results of the earlier stages,
+        or an empty list if the tournament is over. Any randomness must come from rng.
+        """
+        pass
+
+
+@final
+@dataclass(frozen=True)
+class RoundRobin(TournamentFormat):
+    """
+    Every pair of players plays a match, in a single stage.
+    """
+    def pairings(self, stage: int, players: Sequence[AbstractPlayer], standings: 'Standings',
+                 results: Sequence['MatchResult'], rng: random.Random) -> list[Pairing]:
+        return list(get_all_pairs(players)) if stage == 0 else []
+
+
+@final
+@dataclass(frozen=True)
+class SampledPairings(TournamentFormat):
+    """
+    A number of distinct pairs of players, sampled uniformly, play a match, in a single stage.
+    This estimates a round robin of a large population at a fraction of the cost.
+    """
+    matches: int
+
+    def __post_init__(self):
+        if self.matches < 1:
+            raise ValueError(f'Illegal number of sampled matches: {self.matches}')
+
+    def pairings(self, stage: int, players: Sequence[AbstractPlayer], standings: 'Standings',
+                 results: Sequence['MatchResult'], rng: random.Random) -> list[Pairing]:
+        if stage > 0:
+            return []
+        pairs = list(get_all_pairs(players))
+        chosen = sorted(rng.sample(range(len(pairs)), min(self.matches, len(pairs))))
+        return [pairs[index] for index in chosen]
+
+
+@final
+@dataclass(frozen=True)
+class Swiss(TournamentFormat):
+    """
+    In each stage, the players are paired by their standings, each with the best ranked player below it
+    that it has not yet played, if there is one. With an odd number of players, the lowest ranked player
+    that has not yet sat out a stage sits out the stage, without scoring.
+
+    If stages is None, there are ceil(log2(players)) stages, which is enough to single out a winner.
+    """
+    stages: Optional[int] = None
+
+    def __post_init__(self):
+        if self.stages is not None and self.stages < 1:
+            raise ValueError(f'Illegal number of stages: {self.stages}')
+
+    def pairings(self, stage: int, players: Sequence[AbstractPlayer], standings: 'Standings',
+                 results: Sequence['MatchResult'], rng: random.Random) -> list[Pairing]:
+        stages = self.stages if self.stages is not None else max(1, ceil(log2(max(len(players), 1))))
+        if stage >= stages or len(players) < 2:
+            return []
+
+        by_name = {player.name: player for player in players}
+        ranked = [by_name[standing.name] for standing in standings.ranking()]
+        if len(ranked) % 2:
+            # Those who played every stage so far have not sat out.
+            sitting_out = next((player for player in reversed(ranked) if standings[player.name].matches == stage),
+                               ranked[-1])
+            ranked.remove(sitting_out)
+
+        played = {frozenset((result.player1, result.player2)) for result in results}
+        pairings = []
+        while ranked:
+            player = ranked.pop(0)
+            opponent = next((other for other in ranked if frozenset((player.name, other.name)) not in played),
+                            ranked[0])
+            ranked.remove(opponent)
+            pairings.append((player, opponent))
+        return pairings
+
+
+@final
+@dataclass(frozen=True)
+class Knockout(TournamentFormat):
+    """
+    Single elimination: in each stage, the remaining players are paired by seeding, the best against the
+    worst, and the loser of each match is eliminated, until one player remains. With an odd number of
+    remaining players, the best seeded one advances without playing. A drawn match is lost by the lower seed.
+    """
+    def pairings(self, stage: int, players: Sequence[AbstractPlayer], standings: 'Standings',
+                 results: Sequence['MatchResult'], rng: random.Random) -> list[Pairing]:
+        seeds = {player.name: seed for seed, player in enumerate(players)}
+        eliminated = {_knockout_loser(result, seeds) for result in results}
+        remaining = [player for player in players if player.name not in eliminated]
+        if len(remaining) < 2:
+            return []
+        if len(remaining) % 2:
+            remaining.pop(0)
+        half = len(remaining) // 2
+        return [(remaining[i], remaining[-1 - i]) for i in range(half)]
+
+
+def _knockout_loser(result: 'MatchResult', seeds: dict[str, int]) -> str:
+    scores = result.scores[result.player1]
+    if scores[Outcome.WIN] != scores[Outcome.LOSE]:
+        return result.player2 if scores[Outcome.WIN] > scores[Outcome.LOSE] else result.player1
+    return max(result.player1, result.player2, key=lambda name: seeds[name])
@@ -0,0 +1,243 @@
+# Copyright (c) 2024 Sebastian Raaphorst.
+# For license information see LICENSE or https://opensource.org/licenses/BSD-3-Clause
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, fields, InitVar, is_dataclass
+from enum import Enum
+from functools import partial
+from hashlib import sha256
+from statistics import fmean, variance
+from typing import final, Any, Callable, Optional, Sequence
+import json
+import os
+import sys
+
+from rps.match import default_rounds, Match
+from rps.players import AbstractPlayer, PriorTable
+from rps.rps import Outcome
+
+__all__ = [
+    'PayoffMatrix',
+    'PlayerFactory',
+    'PopulationEvaluator',
+]
+
+
+@final
+@dataclass(frozen=True)
+class PlayerFactory:
+    """
+    A recipe for a player: a constructor, usually the class of the player, and its keyword arguments,
+    which must include the name. The constructor must be picklable to be used by worker processes.
+
+    The key identifies the configuration for caching. It is built from the values of the arguments, which
+    may be plain values, enums, sequences and dicts of them, module level functions, prior tables, which
+    are identified by their contents, and dataclasses such as players, which are identified by the values
+    of their fields other than their rng. The init-only arguments of a dataclass, such as the strategies
+    of an ensemble, are read back by its get_<name> method, e.g. get_strategies, and a dataclass without
+    one is rejected, as is any other argument.
+    """
+    constructor: Callable[..., AbstractPlayer]
+    kwargs: dict[str, Any] = field(default_factory=dict)
+
+    # The key, built once, as hashing a prior table reads all of it.
+    _key: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        if 'name' not in self.kwargs:
+            raise ValueError(f'Player factory for {self.constructor.__qualname__} has no name.')
+        arguments = json.dumps({key: _canonical(value) for key, value in self.kwargs.items()}, sort_keys=True)
+        object.__setattr__(self, '_key', f'{_qualified_name(self.constructor)}({arguments})')
+
+    @property
+    def name(self) -> str:
+        return self.kwargs['name']
+
+    @property
+    def key(self) -> str:
+        return self._key
+
+    def create(self) -> AbstractPlayer:
+        return self.constructor(**self.kwargs)
+
+
+def _qualified_name(value: Any) -> str:
+    """
+    Return the module and qualified name of a class or function, if it can be found again by them.
+    """
+    module, qualname = getattr(value, '__module__', None), getattr(value, '__qualname__', None)
+    if module is None or qualname is None or '<' in qualname:
+        raise ValueError(f'Cannot make a player factory key of {value!r}, which is not defined at module level.')
+    found: Any = sys.modules.get(module)
+    for part in qualname.split('.'):
+        found = getattr(found, part, None)
+    if found is not value:
+        raise ValueError(f'Cannot make a player factory key of {value!r}, which is not found by its name.')
+    return f'{module}.{qualname}'
+
+
+def _canonical(value: Any) -> Any:
+    """
+    Return a JSON serializable description of an argument of a player factory, which is the same for
+    equal configurations in every process.
+    """
+    if value is None or isinstance(value, (bool, int, float, str)) and not isinstance(value, Enum):
+        return value
+    if isinstance(value, Enum):
+        return {'enum': _qualified_name(type(value)), 'name': value.name}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    if isinstance(value, dict):
+        items = [[_canonical(key), _canonical(item)] for key, item in value.items()]
+        return {'dict': sorted(items, key=lambda pair: json.dumps(pair, sort_keys=True))}
+    if isinstance(value, PriorTable):
+        return {'prior': value.digest()}
+    if isinstance(value, partial):
+        return {'partial': _canonical(value.func), 'args': _canonical(value.args),
+                'keywords': _canonical(value.keywords)}
+    if is_dataclass(value) and not isinstance(value, type):
+        described = {f.name: _canonical(getattr(value, f.name)) for f in fields(value)
+                     if f.init and not (f.name == 'rng' and isinstance(value, AbstractPlayer))}
+        for name, f in value.__dataclass_fields__.items():
+            if isinstance(f.type, InitVar):
+                getter = getattr(value, f'get_{name}', None)
+                if getter is None:
+                    raise ValueError(f'Cannot make a player factory key of {value!r}, '
+                                     f'whose init-only argument {name} cannot be read back.')
+                described[name] = _canonical(getter())
+        return {'type': _qualified_name(type(value)), 'fields': described}
+    if callable(value):
+        return {'callable': _qualified_name(value)}
+    raise ValueError(f'Cannot make a player factory key of {value!r} of type {type(value).__qualname__}.')
+
+
+@final
+@dataclass(frozen=True)
+class PayoffMatrix:
+    """
+    The payoffs of a population, where mean[i][j] and variance[i][j] are the mean and sample variance
+    over the repetitions of the payoff of player i against player j, i.e. its wins less its losses per
+    round. The matrix is antisymmetric, and the diagonal is zero.
+    """
+    names: list[str]
+    rounds: int
+    repetitions: int
+    mean: list[list[float]]
+    variance: list[list[float]]
+
+    def summary(self) -> str:
+        """
+        A table of the mean payoffs, with the mean payoff of each player against the others last.
+        """
+        width = max(len(name) for name in self.names)
+        column = max(width, 7)
+        lines = [' ' * width + ''.join(f' {name:>{column}}' for name in self.names) + f' {"Mean":>{column}}']
+        for name, row in zip(self.names, self.mean):
+            average = sum(row) / (len(row) - 1) if len(row) > 1 else 0.0
+            lines.append(f'{name:{width}}' + ''.join(f' {payoff:>{column}.3f}' for payoff in row) +
+                         f' {average:>{column}.3f}')
+        return '\n'.join(lines)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {'names': self.names, 'rounds': self.rounds, 'repetitions': self.repetitions,
+                'mean': self.mean, 'variance': self.variance}
+
+
+def _cell_seed(cell_key: str, repetition: int) -> int:
+    return int.from_bytes(sha256(f'{cell_key}#{repetition}'.encode()).digest()[:8], 'little')
+
+
+def _play_cell(task: tuple[PlayerFactory, PlayerFactory, int, int, str]) -> list[float]:
+    """
+    Play the repetitions of a cell, returning the payoffs of the first player. Each repetition is seeded
+    from the key of the cell alone, so a cell has the same payoffs whatever else is in the population.
+    """
+    factory1, factory2, rounds, repetitions, cell_key = task
+    player1, player2 = factory1.create(), factory2.create()
+    payoffs = []
+    for repetition in range(repetitions):
+        match = Match(player1, player2, rounds, rng=_cell_seed(cell_key, repetition))
+        scores = match.play()[player1.name]
+        payoffs.append((scores[Outcome.WIN] - scores[Outcome.LOSE]) / match.rounds_played)
+    return payoffs
+
+
+@final
+@dataclass
+class PopulationEvaluator:
+    """
+    Evaluates the full payoff matrix of a population of players, with several seeded repetitions of
+    each pairing, spreading the pairings over worker processes as Tournament does.
+
+    If cache is set, the payoffs of each pairing are kept in that JSON file, keyed by a hash of the
+    configurations of the two players, the rounds, the repetitions, and the seed, so that evaluating a
+    population again after adding a player only plays the pairings of the new player.
+    """
+    factories: Sequence[PlayerFactory]
+    rounds: int = default_rounds
+    repetitions: int = 5
+    seed: int = 0
+    cache: Optional[str] = None
+    workers: Optional[int] = None
+
+    def __post_init__(self):
+        names = [factory.name for factory in self.factories]
+        if len(names) != len(set(names)):
+            raise ValueError(f'Players do not have unique names: {names}')
+        if self.rounds < 1:
+            raise ValueError(f'Illegal number of rounds: {self.rounds}')
+        if self.repetitions < 2:
+            raise ValueError(f'Illegal number of repetitions, which must be at least 2: {self.repetitions}')
+        if self.workers is not None and self.workers < 1:
+            raise ValueError(f'Illegal number of workers: {self.workers}')
+
+    def _cell_key(self, factory1: PlayerFactory, factory2: PlayerFactory) -> str:
+        description = json.dumps([factory1.key, factory2.key, self.rounds, self.repetitions, self.seed])
+        return sha256(description.encode()).hexdigest()
+
+    def _read_cache(self) -> dict[str, list[float]]:
+        if self.cache is None or not os.path.exists(self.cache):
+            return {}
+        with open(self.cache) as file:
+            return json.load(file)
+
+    def _write_cache(self, cells: dict[str, list[float]]) -> None:
+        temporary = f'{self.cache}.tmp'
+        with open(temporary, 'w') as file:
+            json.dump(cells, file)
+        os.replace(temporary, self.cache)
+
+    def evaluate(self) -> PayoffMatrix:
+        # The cells are kept by the lesser key of the two players, so that the order in the population
+        # does not matter.
+        cells = self._read_cache()
+        size = len(self.factories)
+        pairs = []
+        for i in range(size):
+            for j in range(i + 1, size):
+                first, second = sorted((self.factories[i], self.factories[j]), key=lambda factory: factory.key)
+                pairs.append((i, j, first is self.factories[i], self._cell_key(first, second), first, second))
+
+        tasks = [(first, second, self.rounds, self.repetitions, key)
+                 for _, _, _, key, first, second in pairs if key not in cells]
+        workers = self.workers if self.workers is not None else os.cpu_count() or 1
+        if workers == 1 or len(tasks) <= 1:
+            payoffs = list(map(_play_cell, tasks))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                payoffs = list(executor.map(_play_cell, tasks))
+        for task, cell_payoffs in zip(tasks, payoffs):
+            cells[task[-1]] = cell_payoffs
+        if self.cache is not None and tasks:
+            self._write_cache(cells)
+
+        mean = [[0.0] * size for _ in range(size)]
+        var = [[0.0] * size for _ in range(size)]
+        for i, j, in_order, key, _, _ in pairs:
+            sign = 1 if in_order else -1
+            mean[i][j] = sign * fmean(cells[key])
+            mean[j][i] = -mean[i][j]
+            var[i][j] = var[j][i] = variance(cells[key])
+
+        return PayoffMatrix(names=[factory.name for factory in self.factories], rounds=self.rounds,
+                            repetitions=self.repetitions, mean=mean, variance=var)
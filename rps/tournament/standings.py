@@ -0,0 +1,99 @@
+# Copyright (c) 2024 Sebastian Raaphorst.
+# For license information see LICENSE or https://opensource.org/licenses/BSD-3-Clause
+
+from dataclasses import dataclass, field
+from typing import final, Iterable, Sequence, TYPE_CHECKING
+
+from rps.rps import Outcome
+
+if TYPE_CHECKING:
+    from .tournament import MatchResult
+
+__all__ = [
+    'Standing',
+    'Standings',
+]
+
+
+@final
+@dataclass
+class Standing:
+    """
+    The record of a player over the matches of a tournament so far. A match is won by winning more of
+    its rounds than the opponent, and is a draw if both win as many.
+    """
+    name: str
+    matches: int = 0
+    wins: int = 0
+    draws: int = 0
+    losses: int = 0
+    rounds_won: int = 0
+    rounds_lost: int = 0
+
+    @property
+    def points(self) -> float:
+        return self.wins + self.draws / 2
+
+    @property
+    def round_difference(self) -> int:
+        return self.rounds_won - self.rounds_lost
+
+
+@final
+@dataclass
+class Standings:
+    """
+    The standings of the players of a tournament, updated as each match result arrives. Players are ranked
+    by their points, then by their round difference, and then by their order in names, i.e. their seeding.
+    """
+    names: Sequence[str]
+
+    # The standing of each player by name.
+    table: dict[str, Standing] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.table = {name: Standing(name) for name in self.names}
+
+    @staticmethod
+    def from_results(names: Sequence[str], results: Iterable['MatchResult']) -> 'Standings':
+        standings = Standings(names)
+        for result in results:
+            standings.record(result)
+        return standings
+
+    def __getitem__(self, name: str) -> Standing:
+        return self.table[name]
+
+    def record(self, result: 'MatchResult') -> None:
+        """
+        Add the result of a match to the standings of its two players.
+        """
+        for name in (result.player1, result.player2):
+            scores = result.scores[name]
+            standing = self.table[name]
+            standing.matches += 1
+            standing.rounds_won += scores[Outcome.WIN]
+            standing.rounds_lost += scores[Outcome.LOSE]
+            if scores[Outcome.WIN] > scores[Outcome.LOSE]:
+                standing.wins += 1
+            elif scores[Outcome.WIN] < scores[Outcome.LOSE]:
+                standing.losses += 1
+            else:
+                standing.draws += 1
+
+    def ranking(self) -> list[Standing]:
+        seeds = {name: seed for seed, name in enumerate(self.names)}
+        return sorted(self.table.values(),
+                      key=lambda standing: (-standing.points, -standing.round_difference, seeds[standing.name]))
+
+    def summary(self) -> str:
+        """
+        A table of the standings, in ranking order.
+        """
+        width = max([len('Player'), *(len(name) for name in self.names)])
+        lines = [f'{"Player":{width}} {"Played":>6} {"Won":>5} {"Drawn":>5} {"Lost":>5} {"Points":>7} '
+                 f'{"Rounds +/-":>11}']
+        for standing in self.ranking():
+            lines.append(f'{standing.name:{width}} {standing.matches:>6} {standing.wins:>5} {standing.draws:>5} '
+                         f'{standing.losses:>5} {standing.points:>7.1f} {standing.round_difference:>+11}')
+        return '\n'.join(lines)
@@ -0,0 +1,311 @@
+# Copyright (c) 2024 Sebastian Raaphorst.
+# For license information see LICENSE or https://opensource.org/licenses/BSD-3-Clause
+
+from collections import Counter
+from concurrent.futures import as_completed, ProcessPoolExecutor
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from itertools import chain
+from time import perf_counter
+from typing import final, Any, BinaryIO, Iterable, Iterator, Optional, Sequence
+import os
+import pickle
+
+from .formats import RoundRobin, TournamentFormat
+from .standings import Standings
+from rps.common import make_rng, split_rng
+from rps.match import default_rounds, Instrumentation, Match, StoppingRule
+from rps.match.match import _scores_from_tally
+from rps.players import AbstractPlayer
+from rps.rps import Outcome
+
+__all__ = [
+    'MatchResult',
+    'Tournament',
+    'TournamentResult',
+]
+
+
+@final
+@dataclass(frozen=True)
+class MatchResult:
+    """
+    The outcome of a single pairing in a tournament, where rounds is the number of rounds actually played,
+    which may be fewer than those of the tournament if it has a stopping rule.
+    """
+    player1: str
+    player2: str
+    rounds: int
+    seed: int
+    scores: dict[str, Counter[Outcome]]
+    instrumentation: Optional[Instrumentation] = field(default=None, repr=False, compare=False)
+
+
+@final
+@dataclass(frozen=True)
+class TournamentResult:
+    """
+    The outcomes of all pairings in a tournament, in pairing order, the wall-clock time taken, and the
+    final standings.
+    """
+    match_results: list[MatchResult]
+    elapsed: float
+    standings: Optional[Standings] = field(default=None, repr=False, compare=False)
+
+    @property
+    def total_rounds(self) -> int:
+        return sum(result.rounds for result in self.match_results)
+
+    @property
+    def rounds_per_second(self) -> float:
+        return self.total_rounds / self.elapsed if self.elapsed > 0 else float('inf')
+
+    @property
+    def instrumentation(self) -> Optional[Instrumentation]:
+        """
+        The profiles of the players over all their matches, if the tournament was instrumented.
+        """
+        instrumentations = [result.instrumentation for result in self.match_results
+                            if result.instrumentation is not None]
+        return Instrumentation.merged(instrumentations) if instrumentations else None
+
+
+# The players, number of rounds, seed, whether to instrument, stopping rule, and whether to solve a match.
+_Task = tuple[AbstractPlayer, AbstractPlayer, int, int, bool, Optional[StoppingRule], bool]
+
+
+def _play_match(task: _Task) -> MatchResult:
+    """
+    Play a single seeded match between clones of the players, so the original players are never touched.
+    """
+    player1, player2, rounds, seed, instrument, stopping_rule, analytic = task
+    # The clones get the streams that Match would give the players for the seed.
+    rng = make_rng(seed)
+    player1, player2 = player1.clone(split_rng(rng)), player2.clone(split_rng(rng))
+    if analytic and not instrument:
+        result = _solve_match(player1, player2, seed, rounds, stopping_rule)
+        if result is not None:
+            return result
+    instrumentation = Instrumentation() if instrument else None
+    match = Match(player1, player2, rounds, instrumentation=instrumentation, stopping_rule=stopping_rule)
+    scores = match.play()
+    return MatchResult(player1=player1.name,
+                       player2=player2.name,
+                       rounds=match.rounds_played,
+                       seed=seed,
+                       scores=scores,
+                       instrumentation=instrumentation)
+
+
+def _solve_match(player1: AbstractPlayer, player2: AbstractPlayer, seed: int, rounds: int,
+                 stopping_rule: Optional[StoppingRule]) -> Optional[MatchResult]:
+    """
+    Solve a match between two state machine players without playing it, or return None if either player
+    is not a state machine. The machines start as the players would from their streams, so the result
+    is the same as that of playing the match.
+    """
+    machine1, machine2 = player1.state_machine(), player2.state_machine()
+    if machine1 is None or machine2 is None:
+        return None
+    from rps.analysis import analyze_pair
+    analysis = analyze_pair(machine1, machine2, machine1.start(player1.rng), machine2.start(player2.rng))
+
+    # With a stopping rule, check the tally at the end of each block as Match does.
+    if stopping_rule is None:
+        tally = analysis.tally(rounds)
+    else:
+        for start in range(0, rounds, stopping_rule.check_interval):
+            tally = analysis.tally(min(start + stopping_rule.check_interval, rounds))
+            if stopping_rule.should_stop(wins=tally[1], losses=tally[2], ties=tally[0]):
+                break
+    return MatchResult(player1=player1.name,
+                       player2=player2.name,
+                       rounds=sum(tally),
+                       seed=seed,
+                       scores={player1.name: _scores_from_tally(tally),
+                               player2.name: _scores_from_tally(tally, mirror=True)})
+
+
+def _read_checkpoint(path: str, header: dict[str, Any]) -> dict[tuple[str, str, int], MatchResult]:
+    """
+    Read the results of the completed matches from a checkpoint file, if it exists, keyed by their
+    players and seed. A partially written result at the end, from an interrupted write, is ignored.
+    """
+    results: dict[tuple[str, str, int], MatchResult] = {}
+    if not os.path.exists(path):
+        return results
+    with open(path, 'rb') as file:
+        try:
+            file_header = pickle.load(file)
+        except (EOFError, pickle.UnpicklingError):
+            return results
+        if file_header != header:
+            raise ValueError(f'Checkpoint {path} is for a different tournament: {file_header}')
+        while True:
+            try:
+                result = pickle.load(file)
+            except (EOFError, pickle.UnpicklingError):
+                return results
+            results[(result.player1, result.player2, result.seed)] = result
+
+
+def _write_checkpoint(file: BinaryIO, results: Iterable[Any]) -> None:
+    for result in results:
+        pickle.dump(result, file, protocol=pickle.HIGHEST_PROTOCOL)
+    file.flush()
+
+
+@final
+@dataclass
+class Tournament:
+    """
+    A tournament between players, paired in stages by its format, which by default is a round robin,
+    where every pair of players plays a match.
+
+    The matches of each stage are spread over a pool of worker processes, the most expensive first by the
+    estimated cost of the players, with each idle worker taking the next match. Each match is seeded from
+    a seed derived from the tournament seed and the position of the pairing, so for a fixed seed the
+    results are the same regardless of the number of workers or the order in which the matches complete.
+    The results can be followed as they complete, along with the standings, with stream.
+
+    If workers is None, one worker per CPU is used. If workers is 1, the matches are played serially
+    in this process.
+
+    If instrument is set, every match is instrumented, and the profiles of the players are available
+    from the instrumentation of the result.
+
+    If stopping_rule is set, each match stops as soon as the rule settles its result, so that the rounds
+    are spent on the close pairings.
+
+    If checkpoint is set, the result of each match is saved to the checkpoint file as it completes, and
+    playing the tournament again skips the matches already in it, so that an interrupted tournament can
+    be resumed. This requires a seed, so that the resumed matches are the same as those interrupted.
+    As the file is pickled, it must come from a trusted source.
+
+    If analytic is set, the matches between players that are state machines, such as pattern, constant
+    and previous symbol players, are solved by rps.analysis instead of being played, with the same
+    results. Instrumented matches are always played.
+    """
+    players: Sequence[AbstractPlayer]
+    rounds: int = default_rounds
+    seed: Optional[int] = None
+    workers: Optional[int] = None
+    instrument: bool = False
+    stopping_rule: Optional[StoppingRule] = None
+    checkpoint: Optional[str] = None
+    analytic: bool = False
+    format: TournamentFormat = field(default_factory=RoundRobin)
+
+    def __post_init__(self):
+        names = [player.name for player in self.players]
+        if len(names) != len(set(names)):
+            raise ValueError(f'Players do not have unique names: {names}')
+        if self.workers is not None and self.workers < 1:
+            raise ValueError(f'Illegal number of workers: {self.workers}')
+        if self.checkpoint is not None and self.seed is None:
+            raise ValueError('A checkpointed tournament must have a seed.')
+
+    def play(self) -> TournamentResult:
+        """
+        Play all the matches, returning their results in the order in which they were paired.
+        """
+        schedule: list[tuple[str, str, int]] = []
+        standings = Standings([player.name for player in self.players])
+        start = perf_counter()
+        completed = {_result_key(result): result for result, _ in self._stream(schedule, standings)}
+        elapsed = perf_counter() - start
+        return TournamentResult(match_results=[completed[key] for key in schedule], elapsed=elapsed,
+                                standings=standings)
+
+    def stream(self) -> Iterator[tuple[MatchResult, Standings]]:
+        """
+        Play all the matches, yielding the result of each as it completes along with the standings so far,
+        which are updated in place, so that the standings can be followed while the tournament runs.
+        """
+        return self._stream([], Standings([player.name for player in self.players]))
+
+    def _stream(self, schedule: list[tuple[str, str, int]],
+                standings: Standings) -> Iterator[tuple[MatchResult, Standings]]:
+        """
+        Play the stages of the tournament, adding the key of each pairing to schedule as it is paired.
+        The seed of each match is drawn from the tournament seed in pairing order, after any draws that
+        the format makes to pair the stage, so that the pairings and results are the same for a fixed seed
+        however the matches are spread over the workers.
+        """
+        seed_rng = make_rng(self.seed)
+        workers = self.workers if self.workers is not None else os.cpu_count() or 1
+        completed: dict[tuple[str, str, int], MatchResult] = {}
+        if self.checkpoint is not None:
+            completed = _read_checkpoint(self.checkpoint, self._checkpoint_header())
+        results: list[MatchResult] = []
+
+        with ExitStack() as stack:
+            checkpoint_file = self._open_checkpoint(completed, stack) if self.checkpoint is not None else None
+            executor: Optional[ProcessPoolExecutor] = None
+            stage = 0
+            while pairings := self.format.pairings(stage, self.players, standings, results, seed_rng):
+                tasks = [(p1, p2, self.rounds, seed_rng.getrandbits(64), self.instrument, self.stopping_rule,
+                          self.analytic) for p1, p2 in pairings]
+                keys = [_task_key(task) for task in tasks]
+                schedule.extend(keys)
+                pending = [task for task, key in zip(tasks, keys) if key not in completed]
+                if workers > 1 and len(pending) > 1 and executor is None:
+                    executor = ProcessPoolExecutor(max_workers=workers)
+                    stack.callback(executor.shutdown, cancel_futures=True)
+
+                resumed = [completed[key] for key in keys if key in completed]
+                played = _run(pending, executor if len(pending) > 1 else None)
+                for result in chain(resumed, played):
+                    key = _result_key(result)
+                    if checkpoint_file is not None and key not in completed:
+                        _write_checkpoint(checkpoint_file, [result])
+                    completed[key] = result
+                    results.append(result)
+                    standings.record(result)
+                    yield result, standings
+                stage += 1
+
+    def _checkpoint_header(self) -> dict[str, Any]:
+        return {'players': [player.name for player in self.players],
+                'rounds': self.rounds,
+                'seed': self.seed,
+                'stopping_rule': self.stopping_rule,
+                'format': self.format}
+
+    def _open_checkpoint(self, completed: dict[tuple[str, str, int], MatchResult], stack: ExitStack) -> BinaryIO:
+        """
+        Open the checkpoint to append the results of the matches as they complete. The checkpoint is first
+        replaced by one of the matches completed so far, dropping any partial write.
+        """
+        temporary = f'{self.checkpoint}.tmp'
+        with open(temporary, 'wb') as file:
+            _write_checkpoint(file, [self._checkpoint_header(), *completed.values()])
+        os.replace(temporary, self.checkpoint)
+        return stack.enter_context(open(self.checkpoint, 'ab'))
+
+
+def _task_key(task: _Task) -> tuple[str, str, int]:
+    return task[0].name, task[1].name, task[3]
+
+
+def _result_key(result: MatchResult) -> tuple[str, str, int]:
+    return result.player1, result.player2, result.seed
+
+
+def _estimated_cost(task: _Task) -> float:
+    return task[2] * (task[0].estimated_cost() + task[1].estimated_cost())
+
+
+def _run(tasks: Sequence[_Task], executor: Optional[ProcessPoolExecutor]) -> Iterator[MatchResult]:
+    """
+    Play the matches, yielding their results as they complete. With an executor, the matches are submitted
+    in order of their estimated cost, the most expensive first, and each idle worker takes the next one,
+    so that the cheap matches fill in around the expensive ones at the end instead of an expensive match
+    being left to run alone.
+    """
+    if executor is None:
+        yield from map(_play_match, tasks)
+        return
+    futures = [executor.submit(_play_match, task) for task in sorted(tasks, key=_estimated_cost, reverse=True)]
+    for future in as_completed(futures):
+        yield future.result()